@@ -3,29 +3,71 @@
 PDF Reader MCP Server - An MCP server for reading and searching PDF files using FastMCP
 """
 
+import base64
+import hashlib
+import itertools
 import json
+import string
 import tempfile
-import uuid
+import time
+from bisect import bisect_left
+from collections import OrderedDict
+from operator import itemgetter
 from pathlib import Path
 
 import fitz  # PyMuPDF
 from mcp.server.fastmcp import FastMCP
 
+try:
+    import orjson
+except ImportError:  # optional speedup, installed with the "fast" extra
+    orjson = None
+
 # Initialize FastMCP server
 mcp = FastMCP("pdf-reader")
 
-# Global document store
-documents: dict[str, fitz.Document] = {}
+# Global document store, least recently used first
+MAX_OPEN_DOCUMENTS = 32
+documents: OrderedDict[str, fitz.Document] = OrderedDict()
+_doc_ids = itertools.count(1)
+
+# Rendered pages stay in the temp directory for a week after their last use,
+# so links to them in saved chat transcripts keep working in the meantime
+RENDER_CACHE_MAX_AGE = 7 * 24 * 3600
+# Scanning the temp directory is not free; prune at most this often
+RENDER_CACHE_PRUNE_INTERVAL = 3600
+_last_prune = 0.0
+
+# Directories open_pdf may read from, resolved once at startup
+_ALLOWED_ROOTS = tuple(
+    Path(allowed_path).resolve() for allowed_path in ("/Users", "/tmp", Path.cwd(), tempfile.gettempdir())
+)
+
+# Parsed text pages reused across searches, keyed by (doc_id, page index)
+TEXT_CACHE_SIZE = 256
+_text_cache: OrderedDict[tuple[str, int], tuple[fitz.Page, fitz.TextPage, str]] = OrderedDict()
+
+# MuPDF's search ignores case for ASCII letters only
+_ASCII_LOWER = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+
+# Same flags page.search_for() uses when it builds its own TextPage
+_SEARCH_FLAGS = (
+    fitz.TEXT_DEHYPHENATE
+    | fitz.TEXT_PRESERVE_WHITESPACE
+    | fitz.TEXT_PRESERVE_LIGATURES
+    | fitz.TEXT_MEDIABOX_CLIP
+)
 
 
 def generate_doc_id() -> str:
-    return str(uuid.uuid4())
+    return f"d{next(_doc_ids):x}"
 
 
 def _validate_doc_id(doc_id: str) -> fitz.Document:
     """Validate and return document by ID"""
     if doc_id not in documents:
         raise ValueError("Invalid or missing doc_id")
+    documents.move_to_end(doc_id)
     return documents[doc_id]
 
 
@@ -35,12 +77,49 @@ def _validate_page_range(doc: fitz.Document, page: int) -> None:
         raise ValueError(f"Page number out of range. Valid range: 1-{doc.page_count}")
 
 
+def _get_textpage(doc_id: str, doc: fitz.Document, page_num: int) -> tuple[fitz.Page, fitz.TextPage, str]:
+    """Return a page, its TextPage and case-folded text, parsing the page only on first use"""
+    key = (doc_id, page_num)
+    entry = _text_cache.get(key)
+    if entry is not None:
+        _text_cache.move_to_end(key)
+        return entry
+
+    page = doc[page_num]
+    textpage = page.get_textpage(flags=_SEARCH_FLAGS)
+    entry = (page, textpage, textpage.extractText().translate(_ASCII_LOWER))
+    _text_cache[key] = entry
+    if len(_text_cache) > TEXT_CACHE_SIZE:
+        _text_cache.popitem(last=False)
+    return entry
+
+
+def _evict_text_cache(doc_id: str) -> None:
+    """Drop all cached text pages of a document"""
+    for key in [key for key in _text_cache if key[0] == doc_id]:
+        del _text_cache[key]
+
+
+def _close_document(doc_id: str) -> None:
+    """Close a document and drop everything cached for it"""
+    _evict_text_cache(doc_id)
+    documents.pop(doc_id).close()
+    _release_store()
+
+
+def _release_store() -> None:
+    """Return MuPDF's resource store memory after a document is closed
+
+    The store is capped at MuPDF's default budget (256 MB) but otherwise keeps
+    decoded fonts and images alive until that budget is reached.
+    """
+    fitz.TOOLS.store_shrink(50 if documents else 100)
+
+
 def _is_allowed_path(path: str) -> bool:
     """Check if path is allowed for security"""
-    allowed_paths = ["/Users", "/tmp", Path.cwd(), tempfile.gettempdir()]
-    return any(
-        Path(path).resolve().is_relative_to(Path(allowed_path).resolve()) for allowed_path in allowed_paths
-    )
+    target = Path(path).resolve()
+    return any(target.is_relative_to(root) for root in _ALLOWED_ROOTS)
 
 
 @mcp.tool()
@@ -60,6 +139,10 @@ def open_pdf(path: str) -> str:
 
     doc_id = generate_doc_id()
     documents[doc_id] = doc
+
+    # Clients often never call close_pdf; close the least recently used instead
+    while len(documents) > MAX_OPEN_DOCUMENTS:
+        _close_document(next(iter(documents)))
     return doc_id
 
 
@@ -89,26 +172,129 @@ def extract_text(doc_id: str, page: int) -> str:
     return page_obj.get_text()
 
 
+def _render_cache_path(doc: fitz.Document, page_obj: fitz.Page, dpi: int) -> Path:
+    """Temp file for a rendered page, keyed by file version, page content and DPI"""
+    try:
+        mtime = Path(doc.name).stat().st_mtime_ns
+    except OSError:
+        mtime = 0
+
+    digest = hashlib.sha256(page_obj.read_contents())
+    digest.update(f"{doc.name}:{mtime}:{page_obj.number}:{dpi}".encode())
+    return Path(tempfile.gettempdir()) / f"pdf_cache_{digest.hexdigest()[:16]}.png"
+
+
+def _prune_render_cache() -> None:
+    """Delete rendered pages not used within RENDER_CACHE_MAX_AGE, at most hourly"""
+    global _last_prune  # noqa: PLW0603
+    now = time.time()
+    if now - _last_prune < RENDER_CACHE_PRUNE_INTERVAL:
+        return
+    _last_prune = now
+
+    cutoff = now - RENDER_CACHE_MAX_AGE
+    for cache_file in Path(tempfile.gettempdir()).glob("pdf_cache_*.png"):
+        try:
+            if cache_file.stat().st_mtime < cutoff:
+                cache_file.unlink(missing_ok=True)
+        except OSError:
+            pass
+
+
 @mcp.tool()
-def render_page_png(doc_id: str, page: int, dpi: int = 144) -> str:
+def render_page_png(doc_id: str, page: int, dpi: int = 144, return_bytes: bool = False) -> str:  # noqa: FBT001, FBT002
     """Render a page as PNG image
 
     Args:
         doc_id: Document ID returned by open_pdf
         page: Page number (1-based)
         dpi: Resolution in DPI (default: 144)
+        return_bytes: Return the base64-encoded PNG instead of a file path (default: False)
+
+    Returned files are deleted once unused for RENDER_CACHE_MAX_AGE (7 days).
     """
     doc = _validate_doc_id(doc_id)
     _validate_page_range(doc, page)
 
     page_obj = doc[page - 1]
+    temp_file = _render_cache_path(doc, page_obj, dpi)
+    if temp_file.exists():
+        temp_file.touch()
+        return base64.b64encode(temp_file.read_bytes()).decode() if return_bytes else temp_file
+
     pix = page_obj.get_pixmap(dpi=dpi)
+    if return_bytes:
+        return base64.b64encode(pix.tobytes("png")).decode()
 
-    temp_file = Path(tempfile.gettempdir()) / f"pdf_page_{page}_{uuid.uuid4().hex[:8]}.png"
     pix.save(temp_file)
+    _prune_render_cache()
     return temp_file
 
 
+def _clip_text(words: list[tuple], tops: list[float], max_height: float, clip: fitz.Rect) -> str:
+    """Join the words lying mostly inside clip, one line per text line
+
+    words are TextPage word tuples sorted by their top edge, listed in tops.
+    """
+    lo = bisect_left(tops, clip.y0 - max_height)
+    hi = bisect_left(tops, clip.y1)
+    inside = [word for word in words[lo:hi] if abs(clip & word[:4]) >= 0.5 * abs(fitz.Rect(word[:4]))]
+    inside.sort(key=itemgetter(5, 6, 7))
+
+    lines: dict[tuple[int, int], list[str]] = {}
+    for word in inside:
+        lines.setdefault((word[5], word[6]), []).append(word[4])
+    return "\n".join(" ".join(line) for line in lines.values())
+
+
+def _dump_json(data: list[dict]) -> str:
+    """Serialize tool output, using orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(data).decode()
+    return json.dumps(data, separators=(",", ":"))
+
+
+def _search_page(
+    doc_id: str, doc: fitz.Document, page_num: int, query: str, terms: list[str], limit: int
+) -> list[dict]:
+    """Find up to limit hits of query on one page (0-based) with their surrounding text"""
+    page, textpage, text = _get_textpage(doc_id, doc, page_num)
+    # Skip MuPDF's search on pages whose cached text cannot contain the query
+    if not all(term in text for term in terms):
+        return []
+
+    # search_for runs against the cached TextPage, so it does not re-parse the page and
+    # its boxes cover exactly the matched glyphs rather than whole spans
+    hits = page.search_for(query, textpage=textpage)[:limit]
+    if not hits:
+        return []
+
+    # Extract the words once per page and look up each hit's context by position
+    words = sorted(textpage.extractWORDS(), key=itemgetter(1))
+    tops = [word[1] for word in words]
+    max_height = max((word[3] - word[1] for word in words), default=0)
+    results = []
+    surrounding_rect = fitz.Rect()
+
+    for inst in hits:
+        # Extract surrounding text
+        surrounding_rect.x0 = inst.x0 - 50
+        surrounding_rect.y0 = inst.y0 - 20
+        surrounding_rect.x1 = inst.x1 + 50
+        surrounding_rect.y1 = inst.y1 + 20
+        surrounding_text = _clip_text(words, tops, max_height, surrounding_rect)
+
+        results.append(
+            {
+                "page": page_num + 1,
+                "text": surrounding_text.strip(),
+                "bbox": tuple(inst),
+            },
+        )
+
+    return results
+
+
 @mcp.tool()
 def search_text(doc_id: str, query: str, max_hits: int = 20) -> str:
     """Search for text in the PDF document
@@ -122,37 +308,17 @@ def search_text(doc_id: str, query: str, max_hits: int = 20) -> str:
         raise ValueError("Missing required parameter: query")
 
     doc = _validate_doc_id(doc_id)
+    # Fold the query like MuPDF does so each page can be prefiltered on its cached text
+    terms = query.translate(_ASCII_LOWER).split()
     results = []
 
     for page_num in range(doc.page_count):
-        page = doc[page_num]
-        text_instances = page.search_for(query)
-
-        for inst in text_instances:
-            # Extract surrounding text
-            surrounding_rect = fitz.Rect(
-                inst.x0 - 50,
-                inst.y0 - 20,
-                inst.x1 + 50,
-                inst.y1 + 20,
-            )
-            surrounding_text = page.get_text("text", clip=surrounding_rect)
-
-            results.append(
-                {
-                    "page": page_num + 1,
-                    "text": surrounding_text.strip(),
-                    "bbox": [inst.x0, inst.y0, inst.x1, inst.y1],
-                },
-            )
-
-            if len(results) >= max_hits:
-                break
-
-        if len(results) >= max_hits:
+        remaining = max_hits - len(results)
+        if remaining <= 0:
             break
+        results.extend(_search_page(doc_id, doc, page_num, query, terms, remaining))
 
-    return json.dumps(results, indent=2)
+    return _dump_json(results)
 
 
 @mcp.tool()
@@ -162,9 +328,8 @@ def close_pdf(doc_id: str) -> str:
     Args:
         doc_id: Document ID returned by open_pdf
     """
-    doc = _validate_doc_id(doc_id)
-    doc.close()
-    del documents[doc_id]
+    _validate_doc_id(doc_id)
+    _close_document(doc_id)
     return "Document closed successfully"
 
 
@@ -9,7 +9,7 @@ import pytest
 from reportlab.lib.pagesizes import letter
 from reportlab.pdfgen import canvas
 
-from pdf_reader_server import documents
+from pdf_reader_server import _text_cache, documents
 
 
 @pytest.fixture
@@ -60,6 +60,7 @@ def cleanup_documents():
     """Clean up documents after each test"""
     yield
 
+    _text_cache.clear()
     for doc_id in list(documents.keys()):
         try:
             documents[doc_id].close()
@@ -2,13 +2,19 @@
 Unit tests for PDF Reader MCP Server tools
 """
 
+import base64
 import json
+import os
 import tempfile
+import time
 from pathlib import Path
 
 import pytest
 
+import pdf_reader_server
 from pdf_reader_server import (
+    _dump_json,
+    _text_cache,
     close_pdf,
     documents,
     extract_text,
@@ -112,6 +118,50 @@ def test_search_text_nonexistent_term(sample_pdf_path):
     assert len(results) == 0
 
 
+def test_search_text_reuses_cached_textpages(sample_pdf_path):
+    """Test that repeated searches reuse parsed pages and close_pdf evicts them"""
+    doc_id = open_pdf(sample_pdf_path)
+    first = search_text(doc_id, "page", 10)
+    cached = {key: entry[1] for key, entry in _text_cache.items()}
+    assert set(cached) == {(doc_id, 0), (doc_id, 1)}
+
+    assert search_text(doc_id, "page", 10) == first
+    assert all(_text_cache[key][1] is textpage for key, textpage in cached.items())
+
+    close_pdf(doc_id)
+    assert not _text_cache
+
+
+def test_dump_json_without_orjson(monkeypatch):
+    """Test that serialization falls back to the stdlib json module"""
+    hits = [{"page": 1, "text": "neural", "bbox": [1.0, 2.0, 3.0, 4.0]}]
+    fast = _dump_json(hits)
+
+    monkeypatch.setattr(pdf_reader_server, "orjson", None)
+    assert json.loads(_dump_json(hits)) == json.loads(fast) == hits
+
+
+def test_search_text_respects_max_hits(complex_pdf_path):
+    """Test that the hit cap stops the search before scanning further pages"""
+    doc_id = open_pdf(complex_pdf_path)
+
+    results = json.loads(search_text(doc_id, "reinforcement", 2))
+    assert [result["page"] for result in results] == [1, 2]
+    assert set(_text_cache) == {(doc_id, 0), (doc_id, 1)}
+
+    assert json.loads(search_text(doc_id, "reinforcement", 0)) == []
+
+
+def test_search_text_prefilter_keeps_case_insensitive_matches(complex_pdf_path):
+    """Test that the page text prefilter folds case the same way MuPDF does"""
+    doc_id = open_pdf(complex_pdf_path)
+
+    lower = json.loads(search_text(doc_id, "reinforcement", 50))
+    upper = json.loads(search_text(doc_id, "REINFORCEMENT", 50))
+    assert lower
+    assert upper == lower
+
+
 def test_search_text_empty_query(sample_pdf_path):
     """Test searching with empty query"""
     doc_id = open_pdf(sample_pdf_path)
@@ -129,6 +179,52 @@ def test_render_page_png_valid(sample_pdf_path):
     Path(png_path).unlink()
 
 
+def test_render_page_png_reuses_cached_file(sample_pdf_path):
+    """Test that identical renders share one cached PNG"""
+    doc_id = open_pdf(sample_pdf_path)
+    first = render_page_png(doc_id, 1, 72)
+    assert render_page_png(doc_id, 1, 72) == first
+
+    other = render_page_png(doc_id, 2, 72)
+    assert other != first
+
+    Path(first).unlink()
+    Path(other).unlink()
+
+
+def test_prune_render_cache_keeps_recent_renders(tmp_path, monkeypatch):
+    """Test that only renders unused for RENDER_CACHE_MAX_AGE are deleted"""
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+    recent = tmp_path / "pdf_cache_recent.png"
+    stale = tmp_path / "pdf_cache_stale.png"
+    recent.write_bytes(b"png")
+    stale.write_bytes(b"png")
+    old = time.time() - pdf_reader_server.RENDER_CACHE_MAX_AGE - 60
+    os.utime(stale, (old, old))
+
+    monkeypatch.setattr(pdf_reader_server, "_last_prune", 0.0)
+    pdf_reader_server._prune_render_cache()
+    assert recent.exists()
+    assert not stale.exists()
+
+    # A second call within RENDER_CACHE_PRUNE_INTERVAL does not rescan
+    os.utime(recent, (old, old))
+    pdf_reader_server._prune_render_cache()
+    assert recent.exists()
+
+
+def test_render_page_png_return_bytes(sample_pdf_path):
+    """Test rendering straight to base64 without writing a file"""
+    doc_id = open_pdf(sample_pdf_path)
+    png = base64.b64decode(render_page_png(doc_id, 1, 50, return_bytes=True))
+    assert png.startswith(b"\x89PNG")
+
+    cached = render_page_png(doc_id, 1, 50)
+    assert Path(cached).read_bytes() == png
+    assert base64.b64decode(render_page_png(doc_id, 1, 50, return_bytes=True)) == png
+    Path(cached).unlink()
+
+
 def test_close_pdf_valid(sample_pdf_path):
     """Test closing valid document"""
     doc_id = open_pdf(sample_pdf_path)
@@ -139,6 +235,21 @@ def test_close_pdf_valid(sample_pdf_path):
     assert doc_id not in documents
 
 
+def test_open_pdf_closes_least_recently_used(sample_pdf_path, monkeypatch):
+    """Test that the open document cap evicts the least recently used one"""
+    monkeypatch.setattr(pdf_reader_server, "MAX_OPEN_DOCUMENTS", 2)
+    first = open_pdf(sample_pdf_path)
+    second = open_pdf(sample_pdf_path)
+    search_text(second, "page", 10)
+    page_count(first)
+
+    third = open_pdf(sample_pdf_path)
+    assert list(documents) == [first, third]
+    assert all(key[0] != second for key in _text_cache)
+    with pytest.raises(ValueError, match="Invalid or missing doc_id"):
+        page_count(second)
+
+
 def test_close_pdf_invalid_doc_id():
     """Test closing with invalid doc ID"""
     with pytest.raises(ValueError, match="Invalid or missing doc_id"):
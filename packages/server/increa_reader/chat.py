@@ -4,17 +4,33 @@ Chat API endpoints with streaming support
 
 import asyncio
 import base64
-import json
+import dataclasses
+import io
 import os
 import time
 import uuid
+from collections import OrderedDict
 from pathlib import Path
-
-from claude_agent_sdk import ClaudeAgentOptions, ClaudeSDKClient, create_sdk_mcp_server
+from typing import Any, AsyncIterator, Callable
+
+import orjson
+from claude_agent_sdk import (
+    AssistantMessage,
+    ClaudeAgentOptions,
+    ClaudeSDKClient,
+    ResultMessage,
+    StreamEvent,
+    SystemMessage,
+    create_sdk_mcp_server,
+)
 from fastapi import HTTPException, Request
-from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
+from fastapi.responses import FileResponse, Response, StreamingResponse
 
-from .chat_utils import generate_semantic_filename
+from .chat_utils import (
+    assistant_text,
+    close_filename_clients,
+    generate_semantic_filename,
+)
 from .models import ChatRequest, ChatSaveRequest, WorkspaceConfig
 from .pdf_tools import (
     close_pdf,
@@ -23,6 +39,7 @@ from .pdf_tools import (
     page_count,
     render_page_png,
     search_text,
+    set_allowed_roots,
 )
 from .frontend_tools import (
     FRONTEND_TOOLS,
@@ -34,28 +51,368 @@ from .workspace import build_sdk_env, load_api_settings
 # Debug logging flag
 DEBUG = os.getenv("DEBUG", "false").lower() == "true"
 
-# Global session pool for abort support
+# CLI stderr is only wired up when debugging
+_CLI_STDERR = (lambda line: print(f"[CLI] {line}", flush=True)) if DEBUG else None
+
+# Tools the agent may use unless the request overrides allowedTools
+DEFAULT_TOOLS = (
+    "Read",
+    "Grep",
+    "Glob",
+    "mcp__pdf-reader__open_pdf",
+    "mcp__pdf-reader__page_count",
+    "mcp__pdf-reader__extract_text",
+    "mcp__pdf-reader__render_page_png",
+    "mcp__pdf-reader__search_text",
+    "mcp__pdf-reader__close_pdf",
+    "mcp__frontend__get_visible_content",
+    "mcp__frontend__get_selection",
+    "mcp__frontend__get_current_page",
+    "mcp__frontend__get_document_notes",
+    "mcp__frontend__get_visible_notes",
+    "mcp__frontend__refresh_view",
+    "mcp__frontend__canvas_draw",
+    "mcp__frontend__canvas_clear",
+    "mcp__frontend__canvas_get_instructions",
+    "mcp__frontend__canvas_snapshot",
+    "mcp__frontend__canvas_setup",
+    "mcp__frontend__get_headings",
+    "mcp__frontend__scroll_to_heading",
+)
+
+# Global session pool for abort support; single-key dict operations need no lock
 active_sessions: dict[str, ClaudeSDKClient] = {}
-session_lock = asyncio.Lock()
 
 
-async def cleanup_active_sessions():
-    """Cleanup all active sessions on shutdown"""
-    async with session_lock:
-        for session_id, client in list(active_sessions.items()):
+_SSE_PREFIX = b"data: "
+_SSE_SUFFIX = b"\n\n"
+
+
+def _json_default(obj):
+    """Fallback for SDK objects orjson cannot serialize natively"""
+    return vars(obj) if hasattr(obj, "__dict__") else str(obj)
+
+
+SSE_MEDIA_TYPE = "text/event-stream; charset=utf-8"
+
+# Shared by every SSE response; X-Accel-Buffering stops nginx holding frames back.
+# CORS is left to the app's CORSMiddleware.
+_SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "Connection": "keep-alive",
+    "X-Accel-Buffering": "no",
+}
+
+
+def _sse(data: dict) -> bytes:
+    """Frame one server-sent event; orjson emits UTF-8 without escaping non-ASCII"""
+    return b"".join(
+        (_SSE_PREFIX, orjson.dumps(data, default=_json_default), _SSE_SUFFIX)
+    )
+
+
+# How to turn each usage type into something orjson can serialize, chosen once per type
+_usage_dumpers: dict[type, Callable[[Any], Any]] = {}
+
+
+def _identity(value):
+    return value
+
+
+def _resolve_usage_dumper(usage) -> Callable[[Any], Any]:
+    if usage is None or isinstance(usage, dict):
+        return _identity
+    if dataclasses.is_dataclass(usage):
+        return dataclasses.asdict
+    if hasattr(usage, "model_dump"):
+        return type(usage).model_dump
+    if hasattr(usage, "__dict__"):
+        return vars
+    return _identity
+
+
+def _dump_usage(usage):
+    """Convert ResultMessage.usage to plain data, resolving the conversion per type"""
+    dumper = _usage_dumpers.get(type(usage))
+    if dumper is None:
+        dumper = _usage_dumpers[type(usage)] = _resolve_usage_dumper(usage)
+    return dumper(usage)
+
+
+# Events arriving within this window are merged into one send, up to the byte cap
+SSE_COALESCE_DELAY = 0.010
+SSE_COALESCE_BYTES = 16 * 1024
+
+
+class _FrameBatch:
+    """SSE frames for one send; consecutive text deltas of a content block become one"""
+
+    def __init__(self):
+        self.frames: list[bytes] = []
+        self.size = 0
+        self._text_event: dict | None = None
+        self._text: list[str] = []
+
+    def add(self, payload: dict):
+        event = payload.get("event") if payload.get("type") == "stream_event" else None
+        delta = event.get("delta") if event else None
+        if delta and delta.get("type") == "text_delta":
+            text = delta.get("text", "")
+            self.size += len(text)
+            if self._text_event is not None and self._text_event.get(
+                "index"
+            ) == event.get("index"):
+                self._text.append(text)
+                return
+            self._flush_text()
+            self._text_event = event
+            self._text = [text]
+            return
+
+        self._flush_text()
+        frame = _sse(payload)
+        self.frames.append(frame)
+        self.size += len(frame)
+
+    def _flush_text(self):
+        event = self._text_event
+        if event is None:
+            return
+        if len(self._text) > 1:
+            event = {**event, "delta": {**event["delta"], "text": "".join(self._text)}}
+        self.frames.append(_sse({"type": "stream_event", "event": event}))
+        self._text_event = None
+        self._text = []
+
+    def getvalue(self) -> bytes:
+        self._flush_text()
+        return b"".join(self.frames)
+
+
+async def _encode_events(events: AsyncIterator[dict]) -> AsyncIterator[bytes]:
+    """Send every event as its own SSE frame"""
+    async for payload in events:
+        yield _sse(payload)
+
+
+async def _coalesce_events(
+    events: AsyncIterator[dict], delay: float = SSE_COALESCE_DELAY
+) -> AsyncIterator[bytes]:
+    """Batch events produced within delay seconds so each ASGI send carries several"""
+    queue: asyncio.Queue = asyncio.Queue()
+    done = object()
+
+    async def pump():
+        try:
+            async for payload in events:
+                queue.put_nowait(payload)
+        finally:
+            queue.put_nowait(done)
+
+    loop = asyncio.get_running_loop()
+    task = asyncio.create_task(pump())
+    try:
+        finished = False
+        while not finished:
+            payload = await queue.get()
+            if payload is done:
+                break
+
+            batch = _FrameBatch()
+            batch.add(payload)
+            deadline = loop.time() + delay
+            while batch.size < SSE_COALESCE_BYTES:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    payload = await asyncio.wait_for(queue.get(), remaining)
+                except asyncio.TimeoutError:
+                    break
+                if payload is done:
+                    finished = True
+                    break
+                batch.add(payload)
+
+            yield batch.getvalue()
+
+        # Surface any error raised by the underlying stream
+        await task
+    finally:
+        if not task.done():
+            task.cancel()
             try:
-                await client.interrupt()
-                if DEBUG:
-                    print(f"✓ Interrupted session: {session_id}")
-            except Exception as e:
-                if DEBUG:
-                    print(f"✗ Failed to interrupt session {session_id}: {e}")
-        active_sessions.clear()
+                await task
+            except asyncio.CancelledError:
+                pass
+
+
+# Connected clients kept between queries so resuming a session skips the CLI startup,
+# keyed by session ID plus the options the client was connected with
+MAX_IDLE_CLIENTS = 8
+idle_clients: OrderedDict[tuple, ClaudeSDKClient] = OrderedDict()
+
+
+async def _disconnect_client(client: ClaudeSDKClient):
+    try:
+        await client.disconnect()
+    except Exception as e:
+        if DEBUG:
+            print(f"✗ Failed to disconnect client: {e}")
+
+
+async def acquire_client(key: tuple, options: ClaudeAgentOptions) -> ClaudeSDKClient:
+    """Take an idle client connected with the same session and options, or connect a new one"""
+    client = idle_clients.pop(key, None)
+    if client is not None:
+        if DEBUG:
+            print(f"♻️  Reusing connected client for session: {key[0]}")
+        return client
+
+    client = ClaudeSDKClient(options=options)
+    await client.connect()
+    return client
+
+
+async def release_client(key: tuple, client: ClaudeSDKClient):
+    """Keep a finished client for the next query, disconnecting the least recently used"""
+    stale = idle_clients.pop(key, None)
+    idle_clients[key] = client
+    if stale is not None and stale is not client:
+        await _disconnect_client(stale)
+    while len(idle_clients) > MAX_IDLE_CLIENTS:
+        _, stale = idle_clients.popitem(last=False)
+        await _disconnect_client(stale)
+
+
+# Per-message timestamp format in saved chat logs
+MESSAGE_TIME_FORMAT = "%H:%M:%S"
+
+# Upper bound on the background LLM call that names a saved chat log
+SEMANTIC_NAME_TIMEOUT = 5.0
+
+# Background renames of saved chat logs; strong references keep them alive
+rename_tasks: set[asyncio.Task] = set()
+# Fallback filenames still being renamed, and the final name of recent renames
+pending_renames: set[str] = set()
+renamed_logs: OrderedDict[str, str] = OrderedDict()
+MAX_RENAMED_LOGS = 64
+
+
+def _write_chat_log(filepath: Path, data: bytes):
+    """Write a chat log; the logs directory is recreated only if it was removed"""
+    try:
+        filepath.write_bytes(data)
+    except FileNotFoundError:
+        filepath.parent.mkdir(parents=True, exist_ok=True)
+        filepath.write_bytes(data)
+
+
+async def _rename_with_semantic(
+    filepath: Path, timestamp: str, messages: list[dict]
+) -> Path:
+    """Rename a saved chat log to its semantic filename, returning the final path"""
+    try:
+        semantic_name = await asyncio.wait_for(
+            generate_semantic_filename(messages), timeout=SEMANTIC_NAME_TIMEOUT
+        )
+    except asyncio.TimeoutError:
+        semantic_name = None
+    if not semantic_name:
+        if DEBUG:
+            print(f"⚠️  Keeping fallback filename: {filepath.name}")
+        return filepath
+
+    new_path = filepath.with_name(f"{timestamp}_{semantic_name}.md")
+    try:
+        os.replace(filepath, new_path)
+    except OSError as e:
+        if DEBUG:
+            print(f"✗ Failed to rename chat log {filepath.name}: {e}")
+        return filepath
+    if DEBUG:
+        print(f"✓ Renamed chat log: {new_path.name}")
+    return new_path
+
+
+async def _finish_rename(filepath: Path, timestamp: str, messages: list[dict]):
+    """Run the semantic rename and record the final name for /api/chat/save/{name}"""
+    final_path = filepath
+    try:
+        final_path = await _rename_with_semantic(filepath, timestamp, messages)
+    finally:
+        renamed_logs[filepath.name] = final_path.name
+        while len(renamed_logs) > MAX_RENAMED_LOGS:
+            renamed_logs.popitem(last=False)
+        pending_renames.discard(filepath.name)
+
+
+async def cleanup_active_sessions():
+    """Cleanup all active sessions and pooled clients on shutdown"""
+    # Pop one at a time so sessions registered while we await are cleaned up too
+    while active_sessions:
+        session_id, client = active_sessions.popitem()
+        try:
+            await client.interrupt()
+            if DEBUG:
+                print(f"✓ Interrupted session: {session_id}")
+        except Exception as e:
+            if DEBUG:
+                print(f"✗ Failed to interrupt session {session_id}: {e}")
+
+    while idle_clients:
+        _, client = idle_clients.popitem()
+        await _disconnect_client(client)
+
+    await close_filename_clients()
 
 
 def create_chat_routes(app, workspace_config: WorkspaceConfig):
     """Create chat-related API routes"""
 
+    # MCP servers are the same for every query
+    pdf_server = create_sdk_mcp_server(
+        name="pdf-reader",
+        version="1.0.0",
+        tools=[
+            open_pdf,
+            page_count,
+            extract_text,
+            render_page_png,
+            search_text,
+            close_pdf,
+        ],
+    )
+
+    # Frontend tools MCP server
+    frontend_server = create_sdk_mcp_server(
+        name="frontend",
+        version="1.0.0",
+        tools=FRONTEND_TOOLS,
+    )
+    mcp_servers = {"pdf-reader": pdf_server, "frontend": frontend_server}
+
+    # Per-workspace values derived from the repos, rebuilt only when
+    # /api/config/repos swaps them: prompt prefix and accessible directories
+    workspace_repos: tuple = ()
+    workspace_header = ""
+    workspace_dirs: tuple[str, ...] = ()
+
+    def refresh_workspace():
+        nonlocal workspace_repos, workspace_header, workspace_dirs
+        repos = tuple(workspace_config.repos)
+        # Element-wise compare; once per chat turn over a handful of repos
+        if repos == workspace_repos and workspace_header:
+            return
+        repos_info = "\n".join(f"  - {repo.name}: {repo.root}" for repo in repos)
+        workspace_header = (
+            f"[Workspace Configuration]\nAvailable Repositories:\n{repos_info}\n\n"
+        )
+        workspace_dirs = tuple(repo.root for repo in repos)
+        workspace_repos = repos
+        # PDF tools may open files in exactly the directories the agent can see
+        set_allowed_roots(workspace_dirs)
+
     @app.post("/api/upload/image")
     async def upload_image(request: dict):
         """Upload a base64-encoded image to the first repo's .increa/uploads/ directory"""
@@ -105,79 +462,97 @@ def create_chat_routes(app, workspace_config: WorkspaceConfig):
 
         return FileResponse(filepath, media_type="image/png")
 
+    # Get logs directory from env or use default
+    logs_dir = Path(os.getenv("CHAT_LOGS_DIR", "chat-logs")).expanduser()
+    logs_dir.mkdir(parents=True, exist_ok=True)
+
     @app.post("/api/chat/save")
     async def chat_save(request: ChatSaveRequest):
         """Save chat history to markdown file"""
         from datetime import datetime
 
-        # Get logs directory from env or use default
-        logs_path = os.getenv("CHAT_LOGS_DIR", "chat-logs")
-        logs_dir = Path(logs_path).expanduser()
-        logs_dir.mkdir(parents=True, exist_ok=True)
-
-        # Try to generate semantic filename using LLM
-        semantic_name = await generate_semantic_filename(request.messages)
-
-        # Generate filename with timestamp
+        # Save under the session ID first so the log survives a failed or slow rename
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        if semantic_name:
-            filename = f"{timestamp}_{semantic_name}.md"
-            if DEBUG:
-                print(f"✓ Generated semantic filename: {filename}")
-        else:
-            # Fallback to session ID
-            session_short = request.sessionId[:8] if request.sessionId else "unknown"
-            filename = f"{timestamp}_{session_short}.md"
-            if DEBUG:
-                print(f"⚠️  Using fallback filename: {filename}")
+        session_short = request.sessionId[:8] if request.sessionId else "unknown"
+        filename = f"{timestamp}_{session_short}.md"
         filepath = logs_dir / filename
 
-        # Format as markdown
-        lines = [f"# Chat Session: {request.sessionId}\n"]
-        lines.append(f"**Date**: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+        # Format as markdown into one buffer so the file is written in a single call
+        buf = io.StringIO()
+        write = buf.write
+        write(f"# Chat Session: {request.sessionId}\n")
+        write(f"**Date**: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
 
         if request.stats:
-            lines.append("\n## Statistics\n")
+            write("\n## Statistics\n")
             if request.stats.get("duration"):
                 duration_s = request.stats["duration"] / 1000
-                lines.append(f"- **Duration**: {duration_s:.1f}s\n")
+                write(f"- **Duration**: {duration_s:.1f}s\n")
             if request.stats.get("usage"):
                 usage = request.stats["usage"]
-                lines.append(f"- **Input Tokens**: {usage.get('input_tokens', 0)}\n")
-                lines.append(f"- **Output Tokens**: {usage.get('output_tokens', 0)}\n")
+                write(
+                    f"- **Input Tokens**: {usage.get('input_tokens', 0)}\n"
+                    f"- **Output Tokens**: {usage.get('output_tokens', 0)}\n"
+                )
                 if usage.get("cache_creation_input_tokens"):
-                    lines.append(
+                    write(
                         f"- **Cache Creation**: {usage['cache_creation_input_tokens']}\n"
                     )
 
-        lines.append("\n## Messages\n")
+        write("\n## Messages\n")
+        fromtimestamp = datetime.fromtimestamp
         for msg in request.messages:
             role = msg.get("role", "unknown")
-            content = msg.get("content", "")
-            timestamp_ms = msg.get("timestamp", 0)
-            dt = datetime.fromtimestamp(timestamp_ms / 1000)
-            time_str = dt.strftime("%H:%M:%S")
-
-            lines.append(f"\n### [{time_str}] {role.upper()}\n")
-            lines.append(f"{content}\n")
+            time_str = fromtimestamp(msg.get("timestamp", 0) / 1000).strftime(
+                MESSAGE_TIME_FORMAT
+            )
+            write(f"\n### [{time_str}] {role.upper()}\n{msg.get('content', '')}\n")
 
             # Add tool calls if present
             tool_calls = msg.get("toolCalls", [])
             if tool_calls:
-                lines.append("\n**Tool Calls:**\n")
-                for tool in tool_calls:
-                    tool_name = tool.get("name", "unknown")
-                    tool_status = tool.get("status", "unknown")
-                    lines.append(f"- `{tool_name}` ({tool_status})\n")
+                write("\n**Tool Calls:**\n")
+                write(
+                    "".join(
+                        f"- `{tool.get('name', 'unknown')}` ({tool.get('status', 'unknown')})\n"
+                        for tool in tool_calls
+                    )
+                )
 
-        # Write to file
-        with open(filepath, "w", encoding="utf-8") as f:
-            f.writelines(lines)
+        # Write off the event loop so other streams keep flowing during large saves
+        await asyncio.to_thread(
+            _write_chat_log, filepath, buf.getvalue().encode("utf-8")
+        )
+
+        # Respond right away; the semantic name is applied in the background
+        # and reported through GET /api/chat/save/{filename}
+        pending_renames.add(filename)
+        task = asyncio.create_task(
+            _finish_rename(filepath, timestamp, request.messages)
+        )
+        rename_tasks.add(task)
+        task.add_done_callback(rename_tasks.discard)
 
         return {
             "success": True,
             "filepath": str(filepath),
             "filename": filename,
+            "renamePending": True,
+        }
+
+    @app.get("/api/chat/save/{filename}")
+    async def chat_save_status(filename: str):
+        """Report the final name of a saved chat log once its rename finishes"""
+        if filename in pending_renames:
+            return {"filename": filename, "renamePending": True}
+        final_name = renamed_logs.get(filename, filename)
+        filepath = logs_dir / final_name
+        if Path(final_name).name != final_name or not filepath.is_file():
+            raise HTTPException(status_code=404, detail="Chat log not found")
+        return {
+            "filepath": str(filepath),
+            "filename": final_name,
+            "renamePending": False,
         }
 
     @app.post("/api/chat/abort")
@@ -188,20 +563,19 @@ def create_chat_routes(app, workspace_config: WorkspaceConfig):
         if not session_id:
             raise HTTPException(status_code=400, detail="sessionId is required")
 
-        async with session_lock:
-            client = active_sessions.get(session_id)
-            if client:
-                try:
-                    await client.interrupt()
-                    if DEBUG:
-                        print(f"✓ Interrupted session: {session_id}")
-                    return {"status": "interrupted", "sessionId": session_id}
-                except Exception as e:
-                    if DEBUG:
-                        print(f"✗ Failed to interrupt session {session_id}: {e}")
-                    raise HTTPException(
-                        status_code=500, detail=f"Failed to interrupt: {str(e)}"
-                    )
+        client = active_sessions.get(session_id)
+        if client:
+            try:
+                await client.interrupt()
+                if DEBUG:
+                    print(f"✓ Interrupted session: {session_id}")
+                return {"status": "interrupted", "sessionId": session_id}
+            except Exception as e:
+                if DEBUG:
+                    print(f"✗ Failed to interrupt session {session_id}: {e}")
+                raise HTTPException(
+                    status_code=500, detail=f"Failed to interrupt: {str(e)}"
+                )
 
         raise HTTPException(status_code=404, detail="Session not found or not active")
 
@@ -211,21 +585,30 @@ def create_chat_routes(app, workspace_config: WorkspaceConfig):
         SSE endpoint for frontend tool calls
         Frontend connects to this endpoint and listens for tool call requests
         """
-        async def event_stream():
+
+        async def event_stream() -> AsyncIterator[bytes]:
             """Stream tool call requests to frontend"""
             try:
                 if DEBUG:
                     print("✓ Frontend connected to SSE")
 
                 while True:
-                    # Wait for tool call request from queue
-                    tool_call_msg = await frontend_tool_queue.get()
+                    # Wait for tool call request from queue, then take any others already queued
+                    batch = [await frontend_tool_queue.get()]
+                    try:
+                        while True:
+                            batch.append(frontend_tool_queue.get_nowait())
+                    except asyncio.QueueEmpty:
+                        pass
 
                     if DEBUG:
-                        print(f"🔧 Pushing tool call to frontend: {tool_call_msg['name']}")
+                        for tool_call_msg in batch:
+                            print(
+                                f"🔧 Pushing tool call to frontend: {tool_call_msg['name']}"
+                            )
 
-                    # Send to frontend via SSE
-                    yield f"data: {json.dumps(tool_call_msg, ensure_ascii=False)}\n\n"
+                    # Send to frontend via SSE, one write for the whole batch
+                    yield b"".join(map(_sse, batch))
 
             except asyncio.CancelledError:
                 if DEBUG:
@@ -234,12 +617,8 @@ def create_chat_routes(app, workspace_config: WorkspaceConfig):
 
         return StreamingResponse(
             event_stream(),
-            media_type="text/event-stream",
-            headers={
-                "Cache-Control": "no-cache",
-                "Connection": "keep-alive",
-                "Access-Control-Allow-Origin": "*",
-            },
+            media_type=SSE_MEDIA_TYPE,
+            headers=_SSE_HEADERS,
         )
 
     @app.post("/api/chat/tool-result")
@@ -249,13 +628,13 @@ def create_chat_routes(app, workspace_config: WorkspaceConfig):
 
         Request body:
         {
-            "call_id": str,
+            "call_id": int,
             "result": Any,  # optional, tool execution result
             "error": str    # optional, error message if tool failed
         }
         """
         call_id = request.get("call_id")
-        if not call_id:
+        if call_id is None:
             raise HTTPException(status_code=400, detail="call_id is required")
 
         result = request.get("result")
@@ -270,8 +649,12 @@ def create_chat_routes(app, workspace_config: WorkspaceConfig):
         return {"status": "ok"}
 
     @app.post("/api/chat/query")
-    async def chat_query(request: ChatRequest):
-        """Handle chat queries with streaming response"""
+    async def chat_query(request: ChatRequest, batch_ms: int | None = None):
+        """
+        Handle chat queries with streaming response
+
+        batch_ms overrides the frame coalescing window; 0 sends every event as it arrives
+        """
         if DEBUG:
             print("\n" + "=" * 80)
             print(f"📥 [CHAT REQUEST] {request.prompt[:100]}...")
@@ -288,88 +671,44 @@ def create_chat_routes(app, workspace_config: WorkspaceConfig):
             print("=" * 80 + "\n")
 
         # Determine working directory and accessible directories
+        refresh_workspace()
         cwd = None
-        add_dirs = [r.root for r in workspace_config.repos]
+        add_dirs = workspace_dirs
+        prompt_header = workspace_header
 
         # Use context.repo if available, otherwise use first repo as default
         target_repo = request.context.repo if request.context else None
         if target_repo:
-            repo_config = next(
-                (r for r in workspace_config.repos if r.name == target_repo), None
-            )
+            repo_config = workspace_config.find_repo(target_repo)
             if repo_config:
                 cwd = repo_config.root
             else:
-                return JSONResponse(
-                    content={"error": f"Repository '{target_repo}' not found"},
+                return Response(
+                    content=orjson.dumps(
+                        {"error": f"Repository '{target_repo}' not found"}
+                    ),
                     status_code=404,
+                    media_type="application/json",
                 )
         else:
             # No context repo, use first repo as default cwd
-            if workspace_config.repos:
-                cwd = workspace_config.repos[0].root
-
-        # Configure MCP servers and default tools
-        pdf_server = create_sdk_mcp_server(
-            name="pdf-reader",
-            version="1.0.0",
-            tools=[
-                open_pdf,
-                page_count,
-                extract_text,
-                render_page_png,
-                search_text,
-                close_pdf,
-            ],
-        )
-
-        # Frontend tools MCP server
-        frontend_server = create_sdk_mcp_server(
-            name="frontend",
-            version="1.0.0",
-            tools=FRONTEND_TOOLS,
-        )
-
-        default_tools = [
-            "Read",
-            "Grep",
-            "Glob",
-            "mcp__pdf-reader__open_pdf",
-            "mcp__pdf-reader__page_count",
-            "mcp__pdf-reader__extract_text",
-            "mcp__pdf-reader__render_page_png",
-            "mcp__pdf-reader__search_text",
-            "mcp__pdf-reader__close_pdf",
-            "mcp__frontend__get_visible_content",
-            "mcp__frontend__get_selection",
-            "mcp__frontend__get_current_page",
-            "mcp__frontend__get_document_notes",
-            "mcp__frontend__get_visible_notes",
-            "mcp__frontend__refresh_view",
-            "mcp__frontend__canvas_draw",
-            "mcp__frontend__canvas_clear",
-            "mcp__frontend__canvas_get_instructions",
-            "mcp__frontend__canvas_snapshot",
-            "mcp__frontend__canvas_setup",
-            "mcp__frontend__get_headings",
-            "mcp__frontend__scroll_to_heading",
-        ]
+            if add_dirs:
+                cwd = add_dirs[0]
 
         # Config-first resolution: config.json > env vars
         api_settings = load_api_settings()
         model = (
-            (request.options.get("model") if request.options else None)
-            or api_settings.get("default_model")
-        )
+            request.options.get("model") if request.options else None
+        ) or api_settings.get("default_model")
 
         query_options = ClaudeAgentOptions(
             model=model,
             cwd=cwd,
-            mcp_servers={"pdf-reader": pdf_server, "frontend": frontend_server},
+            mcp_servers=mcp_servers,
             allowed_tools=(
-                request.options.get("allowedTools", default_tools)
+                request.options.get("allowedTools", DEFAULT_TOOLS)
                 if request.options
-                else default_tools
+                else DEFAULT_TOOLS
             ),
             permission_mode=(
                 request.options.get("permissionMode", "bypassPermissions")
@@ -382,7 +721,7 @@ def create_chat_routes(app, workspace_config: WorkspaceConfig):
             max_turns=request.options.get("maxTurns") if request.options else None,
             env=build_sdk_env(),
             add_dirs=add_dirs,
-            stderr=lambda line: print(f"[CLI] {line}", flush=True) if DEBUG else None,
+            stderr=_CLI_STDERR,
         )
 
         if DEBUG:
@@ -392,22 +731,33 @@ def create_chat_routes(app, workspace_config: WorkspaceConfig):
             print(f"  allowed_tools: {len(query_options.allowed_tools)} tools")
             print(f"  resume: {query_options.resume}\n")
 
+        # Everything the client was connected with, apart from the session it resumes
+        client_options_key = (
+            cwd,
+            tuple(add_dirs),
+            tuple(mcp_servers),
+            model,
+            tuple(query_options.allowed_tools),
+            query_options.permission_mode,
+            query_options.max_turns,
+            tuple(sorted(query_options.env.items())),
+        )
+
         # Create client outside generator for abort support
-        client = ClaudeSDKClient(options=query_options)
-        await client.connect()
+        client = await acquire_client(
+            (request.sessionId, *client_options_key), query_options
+        )
 
         # Track session ID for cleanup
         current_session_id = request.sessionId
 
-        async def generate_response():
+        async def generate_response() -> AsyncIterator[dict]:
             """Generate streaming response using ClaudeSDKClient"""
             nonlocal current_session_id
+            # Local copy so the per-message checks below are fast local reads
+            debug = DEBUG
+            completed = False
             try:
-                # Build workspace info
-                repos_info = "\n".join(
-                    [f"  - {repo.name}: {repo.root}" for repo in workspace_config.repos]
-                )
-
                 # Enhance prompt with lightweight context
                 enhanced_prompt = request.prompt
                 if request.context and (request.context.repo or request.context.path):
@@ -417,7 +767,9 @@ def create_chat_routes(app, workspace_config: WorkspaceConfig):
                     if request.context.path:
                         context_info.append(f"Current File: {request.context.path}")
                     if request.context.pageNumber:
-                        context_info.append(f"Current Page: {request.context.pageNumber}")
+                        context_info.append(
+                            f"Current Page: {request.context.pageNumber}"
+                        )
 
                     context_str = "\n".join(context_info)
 
@@ -447,11 +799,7 @@ Canvas tools require a .board file to be open:
 IMPORTANT: The user has {quote_count} quoted text selection(s) in the queue. You MUST call get_selection to retrieve them before answering. These quotes provide critical context for the user's question.
 """
 
-                    enhanced_prompt = f"""[Workspace Configuration]
-Available Repositories:
-{repos_info}
-
-[Current Context]
+                    enhanced_prompt = f"""{prompt_header}[Current Context]
 {context_str}
 
 {tool_guide}
@@ -459,70 +807,91 @@ User Question:
 {request.prompt}"""
                 else:
                     # No specific context, just provide workspace info
-                    enhanced_prompt = f"""[Workspace Configuration]
-Available Repositories:
-{repos_info}
-
-User Question:
-{request.prompt}"""
+                    enhanced_prompt = f"{prompt_header}User Question:\n{request.prompt}"
 
                 await client.query(enhanced_prompt)
 
                 async for msg in client.receive_response():
-                    msg_type = type(msg).__name__
-
-                    if DEBUG:
-                        print(f"📨 [{msg_type}]", flush=True)
-
-                    if msg_type == "SystemMessage" and msg.subtype == "init":
+                    msg_type = type(msg)
+
+                    if debug:
+                        print(f"📨 [{msg_type.__name__}]", flush=True)
+
+                    # Exact type checks, most frequent message first
+                    if msg_type is StreamEvent:
+                        event = msg.event
+                        if event.get("type") == "content_block_delta":
+                            # Empty text deltas render nothing; tool input deltas
+                            # (input_json_delta) carry no text and still go through
+                            delta = event.get("delta") or {}
+                            if delta.get("type") == "text_delta" and not delta.get(
+                                "text"
+                            ):
+                                continue
+                            yield {"type": "stream_event", "event": event}
+
+                    elif msg_type is AssistantMessage:
+                        yield {
+                            "type": "assistant",
+                            "content": assistant_text(msg.content),
+                        }
+
+                    elif msg_type is SystemMessage and msg.subtype == "init":
                         session_id = msg.data.get("session_id")
                         if session_id:
                             current_session_id = session_id
-                            # Register session for abort support
-                            async with session_lock:
-                                active_sessions[session_id] = client
-                            if DEBUG:
+                            # Register session for abort support; a plain dict write,
+                            # so the init frame below is not held up
+                            active_sessions[session_id] = client
+                            if debug:
                                 print(f"✓ Registered session: {session_id}")
 
-                        yield f"data: {json.dumps({'type': 'system', 'subtype': 'init', 'session_id': session_id}, ensure_ascii=False)}\n\n"
-
-                    elif (
-                        msg_type == "StreamEvent"
-                        and msg.event.get("type") == "content_block_delta"
-                    ):
-                        yield f"data: {json.dumps({'type': 'stream_event', 'event': msg.event}, ensure_ascii=False)}\n\n"
+                        yield {
+                            "type": "system",
+                            "subtype": "init",
+                            "session_id": session_id,
+                        }
 
-                    elif msg_type == "AssistantMessage":
-                        content_text = "".join(
-                            block.text
-                            for block in msg.content
-                            if hasattr(block, "text")
-                        )
-                        yield f"data: {json.dumps({'type': 'assistant', 'content': content_text}, ensure_ascii=False)}\n\n"
+                    elif msg_type is ResultMessage:
+                        yield {
+                            "type": "result",
+                            "session_id": msg.session_id,
+                            "duration_ms": msg.duration_ms,
+                            "usage": _dump_usage(msg.usage),
+                        }
 
-                    elif msg_type == "ResultMessage":
-                        yield f"data: {json.dumps({'type': 'result', 'session_id': msg.session_id, 'duration_ms': msg.duration_ms, 'usage': msg.usage.__dict__ if hasattr(msg.usage, '__dict__') else msg.usage}, ensure_ascii=False)}\n\n"
+                completed = True
 
             except Exception as e:
                 print(f"❌ Error in chat response: {e}")
                 import traceback
 
                 traceback.print_exc()
-                yield f"data: {json.dumps({'type': 'error', 'message': str(e)}, ensure_ascii=False)}\n\n"
+                yield {"type": "error", "message": str(e)}
             finally:
                 # Cleanup: remove from active sessions (SDK will auto-cleanup on GC)
                 if current_session_id:
-                    async with session_lock:
-                        active_sessions.pop(current_session_id, None)
-                    if DEBUG:
+                    active_sessions.pop(current_session_id, None)
+                    if debug:
                         print(f"✓ Removed session from pool: {current_session_id}")
 
+                # Only a client that finished its response cleanly can take another query
+                if completed and current_session_id:
+                    await release_client(
+                        (current_session_id, *client_options_key), client
+                    )
+                else:
+                    await _disconnect_client(client)
+
         return StreamingResponse(
-            generate_response(),
-            media_type="text/event-stream",
-            headers={
-                "Cache-Control": "no-cache",
-                "Connection": "keep-alive",
-                "Access-Control-Allow-Origin": "*",
-            },
+            (
+                _encode_events(generate_response())
+                if batch_ms == 0
+                else _coalesce_events(
+                    generate_response(),
+                    SSE_COALESCE_DELAY if batch_ms is None else batch_ms / 1000,
+                )
+            ),
+            media_type=SSE_MEDIA_TYPE,
+            headers=_SSE_HEADERS,
         )
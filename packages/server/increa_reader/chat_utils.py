@@ -4,15 +4,37 @@ Chat utility functions for filename generation and sanitization
 
 import asyncio
 import os
-import re
 
-from claude_agent_sdk import ClaudeAgentOptions, ClaudeSDKClient
+from claude_agent_sdk import (
+    AssistantMessage,
+    ClaudeAgentOptions,
+    ClaudeSDKClient,
+    TextBlock,
+)
 
 from .workspace import build_sdk_env
 
 # Debug logging flag
 DEBUG = os.getenv("DEBUG", "false").lower() == "true"
 
+# Characters that are invalid in filenames on common filesystems, mapped to "_"
+_INVALID_FILENAME_CHARS = str.maketrans(
+    dict.fromkeys('<>:"/\\|?*' + "".join(map(chr, range(0x20))), "_")
+)
+
+# Opening messages shorter than this are used as the filename without asking the LLM
+SHORT_MESSAGE_LENGTH = 80
+
+# Options for the filename client, rebuilt only when the SDK env changes
+_filename_options: ClaudeAgentOptions | None = None
+
+# A client connected ahead of the next filename request. Each client answers a
+# single prompt and is then disconnected, so one chat never leaks into another's name
+_spare_client: tuple[ClaudeAgentOptions, asyncio.Task] | None = None
+# Saves are rare, so an unused spare is disconnected after this many seconds
+SPARE_IDLE_TIMEOUT = 300.0
+_spare_timer: asyncio.TimerHandle | None = None
+
 
 def sanitize_filename(name: str, max_length: int = 40) -> str:
     """
@@ -26,13 +48,112 @@ def sanitize_filename(name: str, max_length: int = 40) -> str:
         Sanitized filename safe for filesystem
     """
     # Remove or replace special characters that are invalid in filenames
-    name = re.sub(r'[<>:"/\\|?*\x00-\x1f]', '_', name)
+    name = name.translate(_INVALID_FILENAME_CHARS)
     # Remove leading/trailing spaces and dots
     name = name.strip('. ')
     # Limit length
     return name[:max_length] if name else "untitled"
 
 
+def assistant_text(content: list) -> str:
+    """Concatenate the text blocks of an AssistantMessage, usually just one"""
+    if len(content) == 1:
+        block = content[0]
+        return block.text if isinstance(block, TextBlock) else ""
+    return "".join([block.text for block in content if isinstance(block, TextBlock)])
+
+
+def _get_filename_options() -> ClaudeAgentOptions:
+    """Return the filename client options, reusing them while the env is unchanged"""
+    global _filename_options
+    env = build_sdk_env()
+    if _filename_options is None or _filename_options.env is not env:
+        _filename_options = ClaudeAgentOptions(
+            allowed_tools=[],  # No tools needed
+            permission_mode="bypassPermissions",
+            max_turns=1,  # Single turn
+            env=env,
+        )
+    return _filename_options
+
+
+async def _connect_filename_client(options: ClaudeAgentOptions) -> ClaudeSDKClient:
+    client = ClaudeSDKClient(options=options)
+    await client.connect()
+    return client
+
+
+async def _disconnect_quietly(client: ClaudeSDKClient) -> None:
+    try:
+        await client.disconnect()
+    except Exception as e:
+        if DEBUG:
+            print(f"✗ Failed to disconnect filename client: {e}")
+
+
+async def _discard_spare(task: asyncio.Task) -> None:
+    try:
+        client = await task
+    except Exception:
+        return
+    await _disconnect_quietly(client)
+
+
+def _take_spare() -> tuple[ClaudeAgentOptions, asyncio.Task] | None:
+    """Detach the spare client and cancel its idle timer"""
+    global _spare_client, _spare_timer
+    spare, _spare_client = _spare_client, None
+    if _spare_timer is not None:
+        _spare_timer.cancel()
+        _spare_timer = None
+    return spare
+
+
+def _expire_spare() -> None:
+    """Idle timer callback: disconnect the unused spare client"""
+    spare = _take_spare()
+    if spare is not None:
+        asyncio.create_task(_discard_spare(spare[1]))
+
+
+async def _acquire_filename_client() -> ClaudeSDKClient:
+    """Take the pre-connected spare client, or connect a new one"""
+    options = _get_filename_options()
+    spare = _take_spare()
+
+    if spare is not None:
+        spare_options, task = spare
+        if spare_options is options:
+            try:
+                return await task
+            except Exception as e:
+                if DEBUG:
+                    print(f"✗ Spare filename client failed to connect: {e}")
+        else:
+            # The env changed after the spare was connected
+            await _discard_spare(task)
+
+    return await _connect_filename_client(options)
+
+
+def _prepare_spare_client() -> None:
+    """Start connecting the client for the next filename request"""
+    global _spare_client, _spare_timer
+    if _spare_client is None:
+        options = _get_filename_options()
+        _spare_client = (options, asyncio.create_task(_connect_filename_client(options)))
+        _spare_timer = asyncio.get_running_loop().call_later(
+            SPARE_IDLE_TIMEOUT, _expire_spare
+        )
+
+
+async def close_filename_clients() -> None:
+    """Disconnect the spare filename client on shutdown"""
+    spare = _take_spare()
+    if spare is not None:
+        await _discard_spare(spare[1])
+
+
 async def generate_semantic_filename(messages: list[dict]) -> str | None:
     """
     Generate semantic filename using Claude Haiku based on conversation content
@@ -46,24 +167,30 @@ async def generate_semantic_filename(messages: list[dict]) -> str | None:
     if not messages:
         return None
 
+    # A short plain-text first user message already names the chat; system and
+    # error messages (/help, /model, failures) say nothing about the topic
+    first_user = next((msg for msg in messages if msg.get("role") == "user"), None)
+    first = (first_user.get("content") or "") if first_user else ""
+    if isinstance(first, str):
+        first = first.strip()
+        if first and len(first) < SHORT_MESSAGE_LENGTH and "```" not in first:
+            return sanitize_filename(first)
+
+    client = None
+    # Only pre-connect the next client after this one answered; after a failed
+    # connect or query another subprocess would most likely fail the same way
+    answered = False
     try:
-        # Extract first 3-5 messages for context (limit tokens)
-        sample_messages = messages[:5]
-
-        # Build conversation summary
-        conversation = []
-        for msg in sample_messages:
-            role = msg.get("role", "unknown")
-            content = msg.get("content", "")
-            if content:
-                # Truncate long messages
-                truncated = content[:200] + "..." if len(content) > 200 else content
-                conversation.append(f"[{role.upper()}] {truncated}")
-
-        if not conversation:
-            return None
+        # Summarize the first 5 messages (limit tokens), truncating long ones
+        conversation_text = "\n".join(
+            f"[{msg.get('role', 'unknown').upper()}] {content[:200]}"
+            f"{'...' if len(content) > 200 else ''}"
+            for msg in messages[:5]
+            if (content := msg.get("content", ""))
+        )
 
-        conversation_text = "\n".join(conversation)
+        if not conversation_text:
+            return None
 
         # Prompt for filename generation
         prompt = f"""根据以下对话内容，生成一个简洁的文件名。
@@ -79,15 +206,7 @@ async def generate_semantic_filename(messages: list[dict]) -> str | None:
 
 只返回文件名，不要其他内容（不要加 .md 后缀，不要加引号）。"""
 
-        options = ClaudeAgentOptions(
-            allowed_tools=[],  # No tools needed
-            permission_mode="bypassPermissions",
-            max_turns=1,  # Single turn
-            env=build_sdk_env(),
-        )
-
-        client = ClaudeSDKClient(options=options)
-        await client.connect()
+        client = await _acquire_filename_client()
 
         # Set timeout for generation
         await asyncio.wait_for(client.query(prompt), timeout=5.0)
@@ -95,15 +214,11 @@ async def generate_semantic_filename(messages: list[dict]) -> str | None:
         # Collect response
         filename = None
         async for msg in client.receive_response():
-            msg_type = type(msg).__name__
-            if msg_type == "AssistantMessage":
+            if isinstance(msg, AssistantMessage):
                 # Extract text from content blocks
-                filename = "".join(
-                    block.text
-                    for block in msg.content
-                    if hasattr(block, "text")
-                ).strip()
+                filename = assistant_text(msg.content).strip()
                 break
+        answered = True
 
         if filename:
             # Sanitize the generated filename
@@ -119,3 +234,8 @@ async def generate_semantic_filename(messages: list[dict]) -> str | None:
         if DEBUG:
             print(f"❌ Failed to generate semantic filename: {e}")
         return None
+    finally:
+        if client is not None:
+            await _disconnect_quietly(client)
+            if answered:
+                _prepare_spare_client()
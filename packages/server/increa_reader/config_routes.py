@@ -60,8 +60,7 @@ def create_config_routes(app: FastAPI, workspace_config: WorkspaceConfig):
         save_workspace_config(new_repos)
 
         # In-place update so all route handlers see the change immediately
-        workspace_config.repos.clear()
-        workspace_config.repos.extend(new_repos)
+        workspace_config.replace_repos(new_repos)
 
         return {
             "data": [
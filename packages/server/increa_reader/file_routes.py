@@ -2,15 +2,22 @@
 File viewing and preview API routes
 """
 
+import asyncio
 import json
 import mimetypes
+import os
+from collections import OrderedDict
+from functools import lru_cache
 from pathlib import Path
+from urllib.parse import quote, urlencode
 
-import aiofiles
-from fastapi import HTTPException
-from fastapi.responses import FileResponse
+import orjson
+from fastapi import HTTPException, Request
+from fastapi.responses import FileResponse, Response
 
 from .models import ViewResponse, WorkspaceConfig
+from .pdf_processor import release_document
+from .pdf_routes import get_pdf_metadata
 from .workspace import is_text_file
 
 # Extension to language mapping for code files
@@ -104,6 +111,173 @@ FILENAME_TO_LANG = {
 }
 
 
+# Extensions previewed as images (including SVG which browsers render natively)
+IMAGE_EXTS = frozenset({".png", ".jpg", ".jpeg", ".gif", ".webp", ".bmp", ".ico", ".svg"})
+HTML_EXTS = frozenset({".html", ".htm"})
+MARKDOWN_EXTS = frozenset({".md", ".markdown"})
+
+# Leading bytes used to tell text from binary before reading the whole file
+TEXT_SNIFF_BYTES = 4096
+
+# Text previews larger than this are sent as a raw file rather than inside the JSON
+LARGE_PREVIEW_BYTES = 64 * 1024
+
+
+# Total size of serialized /api/preview bodies kept in memory
+PREVIEW_CACHE_BYTES = 32 * 1024 * 1024
+
+
+class _PreviewCache:
+    """LRU of serialized preview responses, bounded by their total size"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries: OrderedDict[tuple, bytes] = OrderedDict()
+
+    def get(self, key: tuple) -> bytes | None:
+        body = self._entries.get(key)
+        if body is not None:
+            self._entries.move_to_end(key)
+        return body
+
+    def put(self, key: tuple, body: bytes):
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.size -= len(old)
+        self._entries[key] = body
+        self.size += len(body)
+        while self.size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.size -= len(evicted)
+
+
+# Keyed by request and file (mtime_ns, size), so an edited file misses and its
+# old entry ages out
+_preview_cache = _PreviewCache(PREVIEW_CACHE_BYTES)
+
+
+@lru_cache(maxsize=64)
+def _resolved_root(root: str) -> Path:
+    """Resolve a repo root once rather than stat-ing its components per request"""
+    return Path(root).resolve()
+
+
+def _repo_file_path(root: str, path: str) -> Path:
+    """Join path onto a repo root, rejecting paths that climb out of it.
+
+    Checked lexically so symlinks placed inside a repo stay viewable.
+    """
+    repo_root = _resolved_root(root)
+    file_path = Path(os.path.normpath(repo_root / path))
+    if not file_path.is_relative_to(repo_root):
+        raise HTTPException(status_code=403, detail="Access denied")
+    return file_path
+
+
+@lru_cache(maxsize=2048)
+def _guess_mime(filename: str) -> str | None:
+    """MIME type for a file name; only the name's suffixes matter, so cache by name"""
+    return mimetypes.guess_type(filename)[0]
+
+
+def _read_if_text(file_path: Path, read_rest: bool = True) -> bytes | None:
+    """Read a file's bytes (just its head unless read_rest), or None if its head looks binary"""
+    with open(file_path, "rb") as f:
+        head = f.read(TEXT_SNIFF_BYTES)
+        if not is_text_file(head):
+            return None
+        rest = f.read() if read_rest else b""
+    return head + rest if rest else head
+
+
+async def _read_text(file_path: Path) -> str:
+    """Read a UTF-8 file in one worker thread hop, replacing undecodable bytes"""
+    return await asyncio.to_thread(
+        file_path.read_text, encoding="utf-8", errors="replace"
+    )
+
+
+def _preview_body_url(repo: str, path: str) -> str:
+    return "/api/preview/raw?" + urlencode({"repo": repo, "path": path})
+
+
+async def _text_preview(
+    preview: dict, file_path: Path, size: int, repo: str, path: str
+) -> dict:
+    """Embed the file as the preview body, or point to /api/preview/raw when it is large"""
+    if size > LARGE_PREVIEW_BYTES:
+        preview["bodyUrl"] = _preview_body_url(repo, path)
+    else:
+        preview["body"] = await _read_text(file_path)
+    return preview
+
+
+async def _build_preview(file_path: Path, size: int, repo: str, path: str) -> dict:
+    """Classify a file by name, reading it only when the preview needs its content"""
+    name = file_path.name
+    filename = name.lower()
+    # Same rule as Path.suffix: a leading or trailing dot is not an extension
+    dot = filename.rfind(".")
+    ext = filename[dot:] if 0 < dot < len(filename) - 1 else ""
+
+    # Image files
+    if ext in IMAGE_EXTS:
+        return {"type": "image", "path": path}
+
+    # PDF files
+    if ext == ".pdf":
+        return await get_pdf_metadata(file_path, path)
+
+    # Board files
+    if ext == ".board":
+        content = await _read_text(file_path)
+        board_data = json.loads(content)
+        return {"type": "board", "path": path, "data": board_data}
+
+    # HTML files
+    if ext in HTML_EXTS:
+        return await _text_preview(
+            {"type": "html", "path": path}, file_path, size, repo, path
+        )
+
+    # Markdown files
+    if ext in MARKDOWN_EXTS:
+        return await _text_preview({"type": "markdown"}, file_path, size, repo, path)
+
+    # Mermaid diagram files
+    if ext == ".mmd":
+        return await _text_preview({"type": "mermaid"}, file_path, size, repo, path)
+
+    # Known code/text files by extension or filename
+    lang = FILENAME_TO_LANG.get(filename) or EXT_TO_LANG.get(ext)
+    if lang:
+        return await _text_preview(
+            {"type": "code", "lang": lang}, file_path, size, repo, path
+        )
+
+    # Unknown extension: check MIME type first
+    mime = _guess_mime(name)
+
+    # If MIME type is known and not text/*, treat as unsupported
+    if mime is not None and not mime.startswith("text"):
+        return {"type": "unsupported", "path": path}
+
+    # MIME is text/* or unknown, verify with content detection. A large
+    # file only needs its head checked, as its body is fetched raw.
+    large = size > LARGE_PREVIEW_BYTES
+    content_bytes = await asyncio.to_thread(_read_if_text, file_path, not large)
+
+    if content_bytes is None:
+        return {"type": "unsupported", "path": path}
+
+    if large:
+        return {"type": "code", "lang": "text", "bodyUrl": _preview_body_url(repo, path)}
+
+    content = content_bytes.decode("utf-8", errors="replace")
+    return {"type": "code", "lang": "text", "body": content}
+
+
 def create_file_routes(app, workspace_config: WorkspaceConfig):
     """Create file viewing and preview API routes"""
 
@@ -111,19 +285,19 @@ def create_file_routes(app, workspace_config: WorkspaceConfig):
     async def get_raw_file(repo: str, path: str):
         """Get raw file content (returns file bytes directly)"""
         # Find repository
-        repo_config = next((r for r in workspace_config.repos if r.name == repo), None)
+        repo_config = workspace_config.find_repo(repo)
         if not repo_config:
             raise HTTPException(
                 status_code=404, detail=f"Repository '{repo}' not found"
             )
 
-        file_path = Path(repo_config.root) / path
+        file_path = _repo_file_path(repo_config.root, path)
 
         if not file_path.exists() or not file_path.is_file():
             raise HTTPException(status_code=404, detail="File not found")
 
         # Detect MIME type
-        mime_type, _ = mimetypes.guess_type(str(file_path))
+        mime_type = _guess_mime(file_path.name)
 
         return FileResponse(
             file_path,
@@ -132,138 +306,124 @@ def create_file_routes(app, workspace_config: WorkspaceConfig):
         )
 
     @app.get("/api/views/{repo}/{path:path}")
-    async def get_file_content(repo: str, path: str):
-        """Get file content"""
+    async def get_file_content(repo: str, path: str, raw: bool = False):
+        """Get file content; with raw=true a text file is sent as-is instead of as JSON"""
         # Find repository
-        repo_config = next((r for r in workspace_config.repos if r.name == repo), None)
+        repo_config = workspace_config.find_repo(repo)
         if not repo_config:
             raise HTTPException(
                 status_code=404, detail=f"Repository '{repo}' not found"
             )
 
-        file_path = Path(repo_config.root) / path
+        file_path = _repo_file_path(repo_config.root, path)
 
         if not file_path.exists() or not file_path.is_file():
             raise HTTPException(status_code=404, detail="File not found")
 
-        # Read file content
-        async with aiofiles.open(file_path, "rb") as f:
-            content = await f.read()
+        if raw:
+            # Only the head is read to check for text; the body goes out as a file
+            if await asyncio.to_thread(_read_if_text, file_path, False) is None:
+                raise HTTPException(
+                    status_code=415, detail="Binary file - preview not available"
+                )
+            return FileResponse(
+                file_path,
+                media_type="text/plain; charset=utf-8",
+                headers={
+                    "X-Filename": quote(file_path.name),
+                    "Cache-Control": "no-cache",
+                },
+            )
+
+        # Read file content, stopping early for binary files
+        content = await asyncio.to_thread(_read_if_text, file_path)
 
-        if is_text_file(content):
+        if content is not None:
             return ViewResponse(
                 type="text",
                 content=content.decode("utf-8", errors="replace"),
-                filename=Path(path).name,
+                filename=file_path.name,
             )
         else:
             return ViewResponse(
                 type="binary",
                 content="[Binary file - preview not available]",
-                filename=Path(path).name,
+                filename=file_path.name,
             )
 
     @app.get("/api/preview")
-    async def get_file_preview(repo: str, path: str):
+    async def get_file_preview(request: Request, repo: str, path: str):
         """Get file preview information"""
-        # Import here to avoid circular dependency
-        from .pdf_routes import get_pdf_metadata
-
         # Find repository
-        repo_config = next((r for r in workspace_config.repos if r.name == repo), None)
+        repo_config = workspace_config.find_repo(repo)
         if not repo_config:
             raise HTTPException(
                 status_code=404, detail=f"Repository '{repo}' not found"
             )
 
-        file_path = Path(repo_config.root) / path
+        file_path = _repo_file_path(repo_config.root, path)
 
-        if not file_path.exists():
+        try:
+            st = file_path.stat()
+        except OSError:
             raise HTTPException(status_code=404, detail="File not found")
 
-        ext = Path(path).suffix.lower()
-        filename = Path(path).name.lower()
-
-        # Image files (including SVG which browsers render natively)
-        image_exts = [".png", ".jpg", ".jpeg", ".gif", ".webp", ".bmp", ".ico", ".svg"]
-        if ext in image_exts:
-            return {"type": "image", "path": path}
-
-        # PDF files
-        if ext == ".pdf":
-            return await get_pdf_metadata(file_path, path)
-
-        # Board files
-        if ext == ".board":
-            async with aiofiles.open(file_path, "r", encoding="utf-8") as f:
-                content = await f.read()
-            board_data = json.loads(content)
-            return {"type": "board", "path": path, "data": board_data}
-
-        # HTML files
-        if ext in [".html", ".htm"]:
-            async with aiofiles.open(file_path, "r", encoding="utf-8") as f:
-                content = await f.read()
-            return {"type": "html", "path": path, "body": content}
-
-        # Markdown files
-        if ext in [".md", ".markdown"]:
-            async with aiofiles.open(file_path, "r", encoding="utf-8") as f:
-                content = await f.read()
-            return {"type": "markdown", "body": content}
-
-        # Mermaid diagram files
-        if ext == ".mmd":
-            async with aiofiles.open(file_path, "r", encoding="utf-8") as f:
-                content = await f.read()
-            return {"type": "mermaid", "body": content}
-
-        # Known code/text files by extension or filename
-        lang = FILENAME_TO_LANG.get(filename) or EXT_TO_LANG.get(ext)
-        if lang:
-            async with aiofiles.open(file_path, "r", encoding="utf-8") as f:
-                content = await f.read()
-            return {"type": "code", "lang": lang, "body": content}
-
-        # Unknown extension: check MIME type first
-        mime, _ = mimetypes.guess_type(str(file_path))
-
-        # If MIME type is known and not text/*, treat as unsupported
-        if mime is not None and not mime.startswith("text"):
-            return {"type": "unsupported", "path": path}
-
-        # MIME is text/* or unknown, verify with content detection
-        async with aiofiles.open(file_path, "rb") as f:
-            content_bytes = await f.read()
-
-        if is_text_file(content_bytes):
-            content = content_bytes.decode("utf-8", errors="replace")
-            return {"type": "code", "lang": "text", "body": content}
+        # The browser revalidates with If-None-Match and skips the body when unchanged
+        etag = f'W/"{st.st_mtime_ns:x}-{st.st_size:x}"'
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and etag in (tag.strip() for tag in if_none_match.split(",")):
+            return Response(status_code=304, headers=headers)
+
+        key = (repo, path, str(file_path), st.st_mtime_ns, st.st_size)
+        body = _preview_cache.get(key)
+        if body is None:
+            body = orjson.dumps(await _build_preview(file_path, st.st_size, repo, path))
+            _preview_cache.put(key, body)
+
+        return Response(content=body, media_type="application/json", headers=headers)
+
+    @app.get("/api/preview/raw")
+    async def get_preview_body(repo: str, path: str):
+        """Get the body of a large text preview, sent as-is from the file"""
+        repo_config = workspace_config.find_repo(repo)
+        if not repo_config:
+            raise HTTPException(
+                status_code=404, detail=f"Repository '{repo}' not found"
+            )
 
-        return {"type": "unsupported", "path": path}
+        file_path = _repo_file_path(repo_config.root, path)
+
+        if not file_path.exists() or not file_path.is_file():
+            raise HTTPException(status_code=404, detail="File not found")
+
+        # Revalidate like /api/preview so an edited file is never served stale
+        return FileResponse(
+            file_path,
+            media_type="text/plain; charset=utf-8",
+            headers={"Cache-Control": "no-cache"},
+        )
 
     @app.delete("/api/files/{repo}/{path:path}")
     async def delete_file(repo: str, path: str):
         """Delete a file"""
-        repo_config = next((r for r in workspace_config.repos if r.name == repo), None)
+        repo_config = workspace_config.find_repo(repo)
         if not repo_config:
             raise HTTPException(
                 status_code=404, detail=f"Repository '{repo}' not found"
             )
 
-        file_path = Path(repo_config.root) / path
+        # Security check: prevent path traversal without touching the filesystem
+        file_path = _repo_file_path(repo_config.root, path)
 
-        # Security check: prevent path traversal
+        # Unlinking removes a symlinked file itself, not its target, but a
+        # symlinked directory on the way could still lead out of the repo
         try:
-            file_path = file_path.resolve()
-            repo_root = Path(repo_config.root).resolve()
-            if not str(file_path).startswith(str(repo_root)):
-                raise HTTPException(status_code=403, detail="Access denied")
-        except Exception:
+            parent = file_path.parent.resolve()
+        except (OSError, RuntimeError):
             raise HTTPException(status_code=400, detail="Invalid path")
-
-        if not file_path.exists() or not file_path.is_file():
-            raise HTTPException(status_code=404, detail="File not found")
+        if not parent.is_relative_to(_resolved_root(repo_config.root)):
+            raise HTTPException(status_code=403, detail="Access denied")
 
         # Don't allow deleting directories
         if file_path.is_dir():
@@ -271,7 +431,12 @@ def create_file_routes(app, workspace_config: WorkspaceConfig):
                 status_code=400, detail="Cannot delete directories"
             )
 
+        if not file_path.is_file():
+            raise HTTPException(status_code=404, detail="File not found")
+
         try:
+            # 先释放缓存中的文档句柄
+            release_document(file_path)
             file_path.unlink()
             return {"success": True, "path": path}
         except PermissionError:
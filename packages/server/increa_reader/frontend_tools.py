@@ -3,11 +3,12 @@ Frontend tools - LLM can call these tools to interact with the frontend UI
 """
 
 import asyncio
-import json
+import itertools
 import os
-import uuid
+import time
 from typing import Any, Dict, Optional
 
+import orjson
 from claude_agent_sdk import tool
 
 # Debug logging flag
@@ -18,7 +19,12 @@ DEBUG = os.getenv("DEBUG", "false").lower() == "true"
 frontend_tool_queue: asyncio.Queue = asyncio.Queue()
 
 # Pending tool calls waiting for frontend response
-pending_tool_calls: Dict[str, asyncio.Future] = {}
+pending_tool_calls: Dict[int, asyncio.Future] = {}
+
+# Call ids only need to be unique within the process. Starting from the clock (in µs,
+# well within JS safe integers) keeps a result posted for a call made before a
+# restart from completing a new call with the same id.
+_call_ids = itertools.count(time.time_ns() // 1000)
 
 
 async def frontend_tool_wrapper(name: str, **kwargs) -> dict[str, Any]:
@@ -35,12 +41,12 @@ async def frontend_tool_wrapper(name: str, **kwargs) -> dict[str, Any]:
     Raises:
         TimeoutError: If frontend doesn't respond within 30 seconds
     """
-    call_id = str(uuid.uuid4())
-    future = asyncio.Future()
+    call_id = next(_call_ids)
+    future = asyncio.get_running_loop().create_future()
     pending_tool_calls[call_id] = future
 
     if DEBUG:
-        print(f"🔧 [Frontend Tool] Calling {name} (call_id: {call_id[:8]}...)")
+        print(f"🔧 [Frontend Tool] Calling {name} (call_id: {call_id})")
 
     # Put tool call request into global queue
     await frontend_tool_queue.put(
@@ -69,9 +75,9 @@ async def frontend_tool_wrapper(name: str, **kwargs) -> dict[str, Any]:
         else:
             actual_result = result
 
-        # Format result as text
+        # Format result as text; compact JSON, the model doesn't need indentation
         if isinstance(actual_result, (dict, list)):
-            text = json.dumps(actual_result, ensure_ascii=False, indent=2)
+            text = orjson.dumps(actual_result).decode()
         else:
             text = str(actual_result)
 
@@ -276,7 +282,7 @@ async def canvas_setup(args: dict[str, Any]) -> dict[str, Any]:
     return await frontend_tool_wrapper("canvas_setup", **kwargs)
 
 
-def complete_tool_call(call_id: str, result: Any = None, error: Optional[str] = None):
+def complete_tool_call(call_id: int, result: Any = None, error: Optional[str] = None):
     """
     Complete a pending tool call with result or error
 
@@ -285,7 +291,7 @@ def complete_tool_call(call_id: str, result: Any = None, error: Optional[str] =
     """
     if DEBUG:
         print(
-            f"📨 [Frontend Tool] Received result for call_id: {call_id[:8]}... (error={error is not None})"
+            f"📨 [Frontend Tool] Received result for call_id: {call_id} (error={error is not None})"
         )
 
     future = pending_tool_calls.get(call_id)
@@ -298,7 +304,7 @@ def complete_tool_call(call_id: str, result: Any = None, error: Optional[str] =
             future.set_result({"result": result})
     else:
         if DEBUG:
-            print(f"⚠️  [Frontend Tool] No pending call found for {call_id[:8]}...")
+            print(f"⚠️  [Frontend Tool] No pending call found for {call_id}")
 
 
 @tool(
@@ -5,6 +5,7 @@ Main application entry point for Increa Reader Server
 import os
 from contextlib import asynccontextmanager
 from pathlib import Path
+from typing import Any
 
 # Load environment variables from .env file
 try:
@@ -16,8 +17,11 @@ except ImportError:
         "Warning: python-dotenv not installed. Environment variables from .env file won't be loaded."
     )
 
+import orjson
 import uvicorn
 from fastapi import FastAPI
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse
 
 from .board_routes import create_board_routes
 from .chat import cleanup_active_sessions, create_chat_routes
@@ -27,12 +31,19 @@ from .config_routes import create_config_routes
 from .file_routes import create_file_routes
 from .models import WorkspaceConfig
 from .notes_routes import create_notes_routes
-from .pdf_routes import create_pdf_routes
+from .pdf_routes import create_pdf_routes, shutdown_pdf_pool
 from .session_routes import create_session_routes
 from .workspace import load_workspace_config
 from .workspace_routes import create_workspace_routes
 
 
+class OrjsonResponse(JSONResponse):
+    """JSON response rendered by orjson (FastAPI's own ORJSONResponse is deprecated)"""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
 def _print_startup_warnings(workspace_config: WorkspaceConfig) -> None:
     """Print helpful warnings for missing configuration"""
     if not workspace_config.repos:
@@ -59,6 +70,7 @@ async def lifespan(app: FastAPI):
     # Shutdown
     print("\n🛑 Shutting down Increa Reader Server...")
     await cleanup_active_sessions()
+    shutdown_pdf_pool()
     print("✓ Cleanup completed\n")
 
 
@@ -68,6 +80,7 @@ def create_app() -> FastAPI:
         title="Increa Reader API",
         description="A FastAPI server for increa-reader with PDF and chat capabilities",
         version="1.0.0",
+        default_response_class=OrjsonResponse,
         lifespan=lifespan,
     )
 
@@ -82,6 +95,9 @@ def create_app() -> FastAPI:
         allow_headers=["*"],
     )
 
+    # Compress JSON/markdown bodies; SSE, images and 206 ranges are left alone
+    app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=6)
+
     # Global workspace configuration
     workspace_config = load_workspace_config()
     app.state.workspace_config = workspace_config
@@ -115,11 +131,18 @@ app = create_app()
 
 if __name__ == "__main__":
     port = int(os.getenv("PORT", 3000))
+    # Auto-reload spawns a file watcher; only the dev script turns it on
+    reload = os.getenv("RELOAD", "false").lower() == "true"
     uvicorn.run(
-        app,
+        # Reload needs an import string to re-import the app from
+        "increa_reader.main:app" if reload else app,
         host="0.0.0.0",
         port=port,
-        reload=True,
+        reload=reload,
+        # uvicorn[standard] brings uvloop (not on Windows) and httptools; "auto"
+        # uses them when installed and falls back to asyncio and h11 otherwise
+        loop="auto",
+        http="auto",
         log_level="info",
         timeout_graceful_shutdown=5,
     )
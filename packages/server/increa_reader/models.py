@@ -2,9 +2,9 @@
 Data models for Increa Reader Server
 """
 
-from typing import List, Optional
+from typing import Dict, List, Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, PrivateAttr
 
 
 class RepoItem(BaseModel):
@@ -17,6 +17,20 @@ class WorkspaceConfig(BaseModel):
     repos: List[RepoItem]
     excludes: List[str]
 
+    # Name -> repo index, built on first lookup and reset by replace_repos()
+    _repo_index: Optional[Dict[str, RepoItem]] = PrivateAttr(default=None)
+
+    def replace_repos(self, repos: List[RepoItem]) -> None:
+        """Swap the repo list in place so every route handler sees the change"""
+        self.repos[:] = repos
+        self._repo_index = None
+
+    def find_repo(self, name: str) -> Optional[RepoItem]:
+        """Look up a repo by name; the first repo wins on duplicate names"""
+        if self._repo_index is None:
+            self._repo_index = {repo.name: repo for repo in reversed(self.repos)}
+        return self._repo_index.get(name)
+
 
 class TreeNode(BaseModel):
     type: str  # 'dir' | 'file'
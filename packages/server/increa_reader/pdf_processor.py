@@ -2,25 +2,164 @@
 PDF页面处理：提取文本、图片、表格和数学公式，转换为Markdown
 """
 
+import hashlib
+import os
 import re
 import tempfile
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass
+from operator import itemgetter
 from pathlib import Path
-from typing import Any, Dict, List, Tuple
+from typing import Any, Dict, Iterator, List, Tuple
 
 import fitz  # PyMuPDF
 import pymupdf4llm
 
+# Debug logging flag
+DEBUG = os.getenv("DEBUG", "false").lower() == "true"
+
+# 线段/矩形数量达到该值才认为页面可能含有表格
+TABLE_LINE_THRESHOLD = 4
+
+# 文本分类用的正则在模块加载时编译一次
+_MATH_PATTERNS = tuple(
+    re.compile(pattern)
+    for pattern in (
+        r"\\frac\{",
+        r"\\sqrt\{",
+        r"\\sum\{",
+        r"\\int\{",
+        r"\{.*\}_\{.*\}",  # 下标
+        r"\{.*\}\^\{.*\}",  # 上标
+        r"\\alpha",
+        r"\\beta",
+        r"\\gamma",
+        r"\\delta",
+        r"\\theta",
+        r"\\lambda",
+        r"\\mu",
+        r"\\pi",
+        r"\\sigma",
+        r"\\phi",
+        r"\\omega",
+        r"\\leq",
+        r"\\geq",
+        r"\\neq",
+        r"\\approx",
+        r"\\infty",
+        r"\$.*\$",  # LaTeX数学模式
+    )
+)
+_LIST_PATTERN = re.compile(r"^\s*(?:[-•*]|\d+\.)\s+")
+_MATH_CHARS = frozenset("∑∏∫√±≤≥≠∞∂∇∆αβγδεζηθικλμνξοπρστυφχψω")
+# str.translate 删除数学符号，长度差即符号个数
+_STRIP_MATH_CHARS = dict.fromkeys(map(ord, _MATH_CHARS))
+
+# 页面请求间复用已打开的文档，省去每次解析 xref 表
+MAX_OPEN_DOCUMENTS = 16
+_open_documents: "OrderedDict[Tuple[str, int, int], fitz.Document]" = OrderedDict()
+# PyMuPDF 不是线程安全的，文档只在持有锁时使用
+_documents_lock = threading.RLock()
+
+# 已提取图片的 PNG 数据保存在内存中，不再写入临时目录
+MAX_CACHED_IMAGES = 200
+_extracted_images: "OrderedDict[str, bytes]" = OrderedDict()
+_images_lock = threading.Lock()
+
+# 页面 SVG 渲染结果是确定的，按 (路径, mtime, 大小, 页码) 缓存；
+# 图片多的页面单个 SVG 可达数 MB，因此按总字符数限制，每个 worker 进程各一份
+MAX_CACHED_SVG_CHARS = 32 * 1024 * 1024
+_rendered_svgs: "OrderedDict[Tuple[str, int, int, int], str]" = OrderedDict()
+_rendered_svgs_size = 0
+_svg_lock = threading.Lock()
+
+
+@contextmanager
+def cached_document(doc_path) -> Iterator[fitz.Document]:
+    """打开（或复用）PDF文档，按 (路径, mtime, 大小) 缓存，文件变化后自动重新打开"""
+    path = os.path.abspath(doc_path)
+    st = os.stat(path)
+    key = (path, st.st_mtime_ns, st.st_size)
+    with _documents_lock:
+        doc = _open_documents.get(key)
+        if doc is None:
+            doc = fitz.open(path)
+            _open_documents[key] = doc
+            while len(_open_documents) > MAX_OPEN_DOCUMENTS:
+                _, evicted = _open_documents.popitem(last=False)
+                evicted.close()
+        else:
+            _open_documents.move_to_end(key)
+        yield doc
+
+
+def release_document(doc_path) -> None:
+    """关闭某个文件的缓存文档（例如删除文件前释放句柄）"""
+    path = os.path.abspath(doc_path)
+    with _documents_lock:
+        for key in [key for key in _open_documents if key[0] == path]:
+            _open_documents.pop(key).close()
+
+
+def _cache_image(filename: str, image: bytes) -> None:
+    with _images_lock:
+        _extracted_images[filename] = image
+        _extracted_images.move_to_end(filename)
+        while len(_extracted_images) > MAX_CACHED_IMAGES:
+            _extracted_images.popitem(last=False)
+
+
+def get_cached_image(filename: str) -> bytes | None:
+    """按文件名取出已提取图片的 PNG 数据"""
+    with _images_lock:
+        image = _extracted_images.get(filename)
+        if image is None:
+            return None
+        _extracted_images.move_to_end(filename)
+        return image
+
+
+@dataclass(slots=True)
+class TextItem:
+    """页面上的一个文本块"""
+
+    bbox: Tuple[float, float, float, float]
+    text: str
+    type: str
+    font_size: float
+    font_flags: int
+
+
+@dataclass(slots=True)
+class TableItem:
+    """检测到的表格及其 Markdown"""
+
+    bbox: Tuple[float, float, float, float]
+    markdown: str
+
+
+@dataclass(slots=True)
+class ImageItem:
+    """提取出的图片及其 Markdown 链接"""
+
+    bbox: fitz.Rect
+    markdown: str
+
 
 class PDFPageProcessor:
     """PDF页面处理器"""
 
-    def __init__(self, doc_path: str):
-        self.doc = fitz.open(doc_path)
-        self.temp_dir = Path(tempfile.gettempdir())
+    def __init__(self, doc_path: str, doc: fitz.Document | None = None):
+        # 传入的文档归调用方（如文档缓存）所有，close() 时不关闭
+        self._owns_doc = doc is None
+        self.doc_path = doc_path
+        self.doc = fitz.open(doc_path) if doc is None else doc
 
     def close(self):
         """关闭文档"""
-        if self.doc:
+        if self.doc and self._owns_doc:
             self.doc.close()
 
     def __enter__(self):
@@ -29,25 +168,52 @@ class PDFPageProcessor:
     def __exit__(self, exc_type, exc_val, exc_tb):
         self.close()
 
-    def _extract_page_content(self, page_num: int) -> Dict[str, Any]:
-        """提取页面内容"""
+    def _extract_page_content(
+        self, page_num: int, force_full: bool = False
+    ) -> Dict[str, Any]:
+        """提取页面内容，没有图片和表格线条的页面只走纯文本路径"""
         if page_num < 1 or page_num > self.doc.page_count:
             raise ValueError(f"Page {page_num} out of range (1-{self.doc.page_count})")
 
         page = self.doc[page_num - 1]
 
+        if force_full or self._needs_full_extraction(page):
+            return self._extract_full(page, page_num)
+        return self._extract_fast(page, page_num)
+
+    def _needs_full_extraction(self, page) -> bool:
+        """页面含图片或疑似表格的线框时才需要完整提取"""
+        if page.get_images():
+            return True
+
+        # find_tables 依赖矢量线条，线段/矩形很少的页面不会检出表格
+        line_items = 0
+        for drawing in page.get_drawings():
+            for item in drawing["items"]:
+                if item[0] in ("l", "re"):
+                    line_items += 1
+                    if line_items >= TABLE_LINE_THRESHOLD:
+                        return True
+        return False
+
+    def _extract_fast(self, page, page_num: int) -> Dict[str, Any]:
+        """纯文本路径：只解析文本块并组装 Markdown"""
+        text_blocks = page.get_text("dict")
+        text_content = self._process_text_blocks(text_blocks, [], page.rect)
+        markdown_content = self._assemble_markdown(text_content, [], [], page_num)
+        return self._page_result(page_num, markdown_content, False, False)
+
+    def _extract_full(self, page, page_num: int) -> Dict[str, Any]:
+        """完整路径：检测表格和图片后再处理文本"""
         # 获取页面尺寸
         rect = page.rect
 
         # 提取文本块
         text_blocks = page.get_text("dict")
 
-        # 分析页面结构
-        content_sections = []
-
         # 1. 检测表格
         tables = self._extract_tables(page)
-        table_regions = [table["bbox"] for table in tables]
+        table_regions = [table.bbox for table in tables]
 
         # 2. 检测图片
         images = self._extract_images(page, page_num)
@@ -60,16 +226,22 @@ class PDFPageProcessor:
             text_content, tables, images, page_num
         )
 
+        return self._page_result(
+            page_num, markdown_content, len(tables) > 0, len(images) > 0
+        )
+
+    def _page_result(
+        self, page_num: int, markdown: str, has_tables: bool, has_images: bool
+    ) -> Dict[str, Any]:
         return {
             "page": page_num,
-            "markdown": markdown_content,
-            "has_tables": len(tables) > 0,
-            "has_images": len(images) > 0,
-            "estimated_reading_time": len(markdown_content.split())
-            // 200,  # 假设每分钟200词
+            "markdown": markdown,
+            "has_tables": has_tables,
+            "has_images": has_images,
+            "estimated_reading_time": len(markdown.split()) // 200,  # 假设每分钟200词
         }
 
-    def _extract_tables(self, page) -> List[Dict[str, Any]]:
+    def _extract_tables(self, page) -> List[TableItem]:
         """提取表格"""
         tables = []
 
@@ -77,21 +249,13 @@ class PDFPageProcessor:
             # 使用PyMuPDF的表格检测
             table_finder = page.find_tables()
 
-            for table_idx, table in enumerate(table_finder.tables):
+            for table in table_finder.tables:
                 table_data = table.extract()
 
                 # 转换为Markdown表格
                 markdown_table = self._convert_table_to_markdown(table_data)
 
-                tables.append(
-                    {
-                        "id": f"table_{table_idx + 1}",
-                        "bbox": table.bbox,
-                        "markdown": markdown_table,
-                        "rows": len(table_data),
-                        "cols": len(table_data[0]) if table_data else 0,
-                    }
-                )
+                tables.append(TableItem(table.bbox, markdown_table))
 
         except Exception as e:
             # 如果表格检测失败，尝试简单的网格检测
@@ -132,120 +296,119 @@ class PDFPageProcessor:
 
         return "\n".join(markdown_lines)
 
-    def _extract_images(self, page, page_num: int) -> List[Dict[str, Any]]:
+    def _extract_images(self, page, page_num: int) -> List[ImageItem]:
         """提取图片"""
         images = []
 
         try:
-            image_list = page.get_images()
-            print(f"Page {page_num}: Found {len(image_list)} images")  # 调试日志
+            image_list = page.get_images(full=True)
+            if DEBUG:
+                print(f"Page {page_num}: Found {len(image_list)} images")  # 调试日志
+
+            # 同一文档版本的同一 xref 只解码一次
+            st = os.stat(self.doc_path)
+            doc_key = hashlib.sha1(
+                f"{os.path.abspath(self.doc_path)}:{st.st_mtime_ns}".encode()
+            ).hexdigest()[:12]
 
             for img_idx, img in enumerate(image_list):
-                # 获取图片
                 xref = img[0]
-                pix = fitz.Pixmap(self.doc, xref)
-
-                # 跳过CMYK图像
-                if pix.n - pix.alpha < 4:
-                    # 保存图片到临时文件
-                    img_filename = f"pdf_p{page_num}_img{img_idx + 1}.png"
-                    img_path = self.temp_dir / img_filename
-                    pix.save(img_path)
-
-                    # 获取图片位置
-                    img_rect = page.get_image_bbox(img)
-
-                    images.append(
-                        {
-                            "id": f"image_{img_idx + 1}",
-                            "path": str(img_path),
-                            "bbox": img_rect,
-                            "width": pix.width,
-                            "height": pix.height,
-                            "markdown": f"![图片{img_idx + 1}](/api/temp-image/{img_filename})",
-                        }
-                    )
-                    print(
-                        f"  Image {img_idx + 1} extracted: {img_filename}"
-                    )  # 调试日志
-                else:
-                    print(f"  Image {img_idx + 1} skipped (CMYK)")  # 调试日志
+                img_filename = f"pdf_{doc_key}_x{xref}.png"
+
+                with _images_lock:
+                    cached = img_filename in _extracted_images
+                if not cached:
+                    pix = fitz.Pixmap(self.doc, xref)
 
-                pix = None  # 释放内存
+                    # 跳过CMYK图像
+                    if pix.n - pix.alpha >= 4:
+                        if DEBUG:
+                            print(f"  Image {img_idx + 1} skipped (CMYK)")  # 调试日志
+                        continue
+
+                    _cache_image(img_filename, pix.tobytes("png"))
+                    pix = None  # 释放内存
+
+                # 获取图片位置
+                img_rect = page.get_image_bbox(img)
+
+                images.append(
+                    ImageItem(
+                        img_rect,
+                        f"![图片{img_idx + 1}](/api/temp-image/{img_filename})",
+                    )
+                )
+                if DEBUG:
+                    print(f"  Image {img_idx + 1} extracted: {img_filename}")  # 调试日志
 
         except Exception as e:
             print(f"Error extracting images: {e}")
 
-        print(f"Page {page_num}: Total {len(images)} images extracted")  # 调试日志
+        if DEBUG:
+            print(f"Page {page_num}: Total {len(images)} images extracted")  # 调试日志
         return images
 
     def _process_text_blocks(
         self, text_blocks: Dict, table_regions: List, page_rect
-    ) -> List[Dict[str, Any]]:
+    ) -> List[TextItem]:
         """处理文本块，识别段落、标题、公式"""
         content = []
 
         if "blocks" not in text_blocks:
             return content
 
-        # 按y坐标排序文本块（从上到下）
-        blocks = sorted(text_blocks["blocks"], key=lambda b: b["bbox"][1])
+        # 保持块的原始顺序，统一在 _assemble_markdown 中按y坐标排序
+        table_rects = [fitz.Rect(region) for region in table_regions]
 
-        for block in blocks:
+        for block in text_blocks["blocks"]:
             if block["type"] != 0:  # 0表示文本块
                 continue
 
             # 检查是否在表格区域内
-            block_rect = fitz.Rect(block["bbox"])
-            in_table = any(
-                block_rect.intersects(table_region) for table_region in table_regions
-            )
-
-            if in_table:
-                continue
+            if table_rects:
+                block_rect = fitz.Rect(block["bbox"])
+                if any(block_rect.intersects(rect) for rect in table_rects):
+                    continue
 
             # 提取文本
-            block_text = ""
-            if "lines" in block:
-                for line in block["lines"]:
-                    if "spans" in line:
-                        line_text = ""
-                        for span in line["spans"]:
-                            line_text += span["text"]
-                        block_text += line_text + "\n"
-
-            block_text = block_text.strip()
+            block_text = "\n".join(
+                "".join(span["text"] for span in line["spans"])
+                for line in block.get("lines", ())
+                if "spans" in line
+            ).strip()
             if not block_text:
                 continue
 
-            # 分析文本类型
-            text_type = self._classify_text(block_text, block)
+            # 分析文本类型，字体信息每个块只取一次
+            font_info = self._get_font_info(block)
+            font_size = font_info.get("size", 12)
+            text_type = self._classify_text(block_text, font_size)
 
             content.append(
-                {
-                    "type": text_type,
-                    "text": block_text,
-                    "bbox": block["bbox"],
-                    "font_info": self._get_font_info(block),
-                }
+                TextItem(
+                    block["bbox"],
+                    block_text,
+                    text_type,
+                    font_size,
+                    font_info.get("flags", 0),
+                )
             )
 
         return content
 
-    def _classify_text(self, text: str, block: Dict) -> str:
+    def _classify_text(self, text: str, font_size: float) -> str:
         """分类文本类型：标题、段落、公式等"""
         # 检测数学公式（简单启发式）
         if self._is_math_formula(text):
             return "formula"
 
         # 检测标题（基于字体大小和文本特征）
-        font_info = self._get_font_info(block)
-        if font_info and font_info.get("size", 12) > 14:
+        if font_size > 14:
             if text.strip().endswith(":") or len(text.strip()) < 100:
                 return "heading"
 
         # 检测列表项
-        if re.match(r"^\s*[-•*]\s+", text) or re.match(r"^\s*\d+\.\s+", text):
+        if _LIST_PATTERN.match(text):
             return "list"
 
         # 默认为段落
@@ -254,41 +417,14 @@ class PDFPageProcessor:
     def _is_math_formula(self, text: str) -> bool:
         """检测是否为数学公式"""
         # 简单的数学公式检测
-        math_indicators = [
-            r"\\frac\{",
-            r"\\sqrt\{",
-            r"\\sum\{",
-            r"\\int\{",
-            r"\{.*\}_\{.*\}",  # 下标
-            r"\{.*\}\^\{.*\}",  # 上标
-            r"\\alpha",
-            r"\\beta",
-            r"\\gamma",
-            r"\\delta",
-            r"\\theta",
-            r"\\lambda",
-            r"\\mu",
-            r"\\pi",
-            r"\\sigma",
-            r"\\phi",
-            r"\\omega",
-            r"\\leq",
-            r"\\geq",
-            r"\\neq",
-            r"\\approx",
-            r"\\infty",
-            r"\$.*\$",  # LaTeX数学模式
-        ]
-
-        for pattern in math_indicators:
-            if re.search(pattern, text):
-                return True
+        if any(pattern.search(text) for pattern in _MATH_PATTERNS):
+            return True
 
         # 如果文本包含大量数学符号且较短，可能是公式
-        math_chars = set("∑∏∫√±≤≥≠∞∂∇∆αβγδεζηθικλμνξοπρστυφχψω")
-        ratio = sum(1 for c in text if c in math_chars) / len(text) if text else 0
-
-        return ratio > 0.2 and len(text.strip()) < 200
+        if not text:
+            return False
+        math_count = len(text) - len(text.translate(_STRIP_MATH_CHARS))
+        return math_count / len(text) > 0.2 and len(text.strip()) < 200
 
     def _get_font_info(self, block: Dict) -> Dict[str, Any]:
         """获取字体信息"""
@@ -308,59 +444,28 @@ class PDFPageProcessor:
 
     def _assemble_markdown(
         self,
-        text_content: List[Dict],
-        tables: List[Dict],
-        images: List[Dict],
+        text_content: List[TextItem],
+        tables: List[TableItem],
+        images: List[ImageItem],
         page_num: int,
     ) -> str:
         """组装最终的Markdown内容"""
-        print(
-            f"Assembling markdown for page {page_num}: {len(text_content)} texts, {len(tables)} tables, {len(images)} images"
-        )  # 调试
-        markdown_parts = []
-
-        # 按位置排序所有内容
-        all_content = []
-
-        # 添加文本内容
-        for idx, item in enumerate(text_content):
-            all_content.append(
-                {
-                    "type": "text",
-                    "subtype": item["type"],
-                    "content": item,
-                    "bbox": item["bbox"],
-                    "order": idx,
-                }
-            )
-
-        # 添加表格
-        for idx, table in enumerate(tables):
-            all_content.append(
-                {"type": "table", "content": table, "bbox": table["bbox"], "order": idx}
-            )
-
-        # 添加图片
-        for idx, image in enumerate(images):
-            print(f"  Adding image to content: {image['markdown']}")  # 调试
-            all_content.append(
-                {"type": "image", "content": image, "bbox": image["bbox"], "order": idx}
-            )
+        if DEBUG:
+            print(
+                f"Assembling markdown for page {page_num}: {len(text_content)} texts, {len(tables)} tables, {len(images)} images"
+            )  # 调试
+        # (y, markdown) 列表，整页内容只按y坐标排序一次
+        all_content: List[Tuple[float, str]] = [
+            (item.bbox[1], self._format_text_content(item)) for item in text_content
+        ]
+        all_content.extend((table.bbox[1], f"\n{table.markdown}\n") for table in tables)
+        for image in images:
+            if DEBUG:
+                print(f"  Adding image to content: {image.markdown}")  # 调试
+            all_content.append((image.bbox[1], f"\n{image.markdown}\n"))
 
-        # 按y坐标排序
-        all_content.sort(key=lambda x: x["bbox"][1])
-
-        # 生成Markdown
-        for item in all_content:
-            if item["type"] == "text":
-                markdown_parts.append(self._format_text_content(item["content"]))
-            elif item["type"] == "table":
-                markdown_parts.append(f"\n{item['content']['markdown']}\n")
-            elif item["type"] == "image":
-                print(
-                    f"  Appending image markdown: {item['content']['markdown']}"
-                )  # 调试
-                markdown_parts.append(f"\n{item['content']['markdown']}\n")
+        all_content.sort(key=itemgetter(0))
+        markdown_parts = [markdown for _, markdown in all_content]
 
         # 添加页面分隔符
         result = "\n".join(markdown_parts)
@@ -369,14 +474,14 @@ class PDFPageProcessor:
 
         return result
 
-    def _format_text_content(self, text_item: Dict) -> str:
+    def _format_text_content(self, text_item: TextItem) -> str:
         """格式化文本内容为Markdown"""
-        text = text_item["text"]
-        text_type = text_item["type"]
+        text = text_item.text
+        text_type = text_item.type
 
         if text_type == "heading":
             # 根据字体大小确定标题级别
-            font_size = text_item.get("font_info", {}).get("size", 12)
+            font_size = text_item.font_size
             if font_size > 18:
                 level = 1
             elif font_size > 16:
@@ -424,55 +529,54 @@ def extract_page_markdown(doc_path: str, page_num: int) -> Dict[str, Any]:
         Dict containing markdown content and metadata
     """
     try:
-        doc = fitz.open(doc_path)
-
-        # 使用 pymupdf4llm 提取指定页面的 markdown
-        # 注意: pymupdf4llm 使用 0-based 页码
-        # write_images=True 会将图片写入磁盘
-        import tempfile
-
-        img_dir = Path(tempfile.gettempdir()) / "pymupdf4llm_images"
-        img_dir.mkdir(exist_ok=True)
-
-        md_text = pymupdf4llm.to_markdown(
-            doc,
-            pages=[page_num - 1],
-            write_images=True,
-            image_path=str(img_dir),
-            image_format="png",
-        )
-
-        # 替换绝对路径为 API 路径
-        # 从 /var/.../pymupdf4llm_images/xxx.png 替换为 /api/temp-image/pymupdf4llm_images/xxx.png
-        import re
+        with cached_document(doc_path) as doc:
+            return _extract_page_markdown(doc, page_num)
+    except Exception as e:
+        print(f"Error extracting markdown for page {page_num}: {e}")
+        raise
 
-        img_dir_str = str(img_dir)
-        md_text = re.sub(
-            r"!\[(.*?)\]\(" + re.escape(img_dir_str) + r"/([^)]+)\)",
-            r"![\1](/api/temp-image/pymupdf4llm_images/\2)",
-            md_text,
-        )
 
+def _extract_page_markdown(doc: fitz.Document, page_num: int) -> Dict[str, Any]:
+    """对已打开的文档提取单页 Markdown"""
+    # 使用 pymupdf4llm 提取指定页面的 markdown
+    # 注意: pymupdf4llm 使用 0-based 页码
+    # write_images=True 会将图片写入磁盘
+    img_dir = Path(tempfile.gettempdir()) / "pymupdf4llm_images"
+    img_dir.mkdir(exist_ok=True)
+
+    md_text = pymupdf4llm.to_markdown(
+        doc,
+        pages=[page_num - 1],
+        write_images=True,
+        image_path=str(img_dir),
+        image_format="png",
+    )
+
+    # 替换绝对路径为 API 路径
+    # 从 /var/.../pymupdf4llm_images/xxx.png 替换为 /api/temp-image/pymupdf4llm_images/xxx.png
+    img_dir_str = str(img_dir)
+    md_text = re.sub(
+        r"!\[(.*?)\]\(" + re.escape(img_dir_str) + r"/([^)]+)\)",
+        r"![\1](/api/temp-image/pymupdf4llm_images/\2)",
+        md_text,
+    )
+
+    if DEBUG:
         print(
             f"Page {page_num} markdown preview (after path replacement):\n{md_text[:500]}"
         )  # 调试
 
-        # 检测是否有表格和图片（简单启发式）
-        has_tables = "|" in md_text and "---" in md_text  # Markdown 表格特征
-        has_images = "![" in md_text  # Markdown 图片特征
+    # 检测是否有表格和图片（简单启发式）
+    has_tables = "|" in md_text and "---" in md_text  # Markdown 表格特征
+    has_images = "![" in md_text  # Markdown 图片特征
 
-        doc.close()
-
-        return {
-            "page": page_num,
-            "markdown": md_text,
-            "has_tables": has_tables,
-            "has_images": has_images,
-            "estimated_reading_time": len(md_text.split()) // 200,
-        }
-    except Exception as e:
-        print(f"Error extracting markdown for page {page_num}: {e}")
-        raise
+    return {
+        "page": page_num,
+        "markdown": md_text,
+        "has_tables": has_tables,
+        "has_images": has_images,
+        "estimated_reading_time": len(md_text.split()) // 200,
+    }
 
 
 def render_page_svg(doc_path: str, page_num: int) -> str:
@@ -486,8 +590,30 @@ def render_page_svg(doc_path: str, page_num: int) -> str:
     Returns:
         SVG content as string
     """
-    processor = PDFPageProcessor(doc_path)
-    try:
-        return processor.render_page_svg(page_num)
-    finally:
-        processor.close()
+    global _rendered_svgs_size
+    path = os.path.abspath(doc_path)
+    st = os.stat(path)
+    key = (path, st.st_mtime_ns, st.st_size, page_num)
+    with _svg_lock:
+        svg = _rendered_svgs.get(key)
+        if svg is not None:
+            _rendered_svgs.move_to_end(key)
+            return svg
+
+    with cached_document(doc_path) as doc, PDFPageProcessor(doc_path, doc) as processor:
+        svg = processor.render_page_svg(page_num)
+
+    # 超过整个缓存上限的 SVG 不缓存，免得把其他页全部挤出
+    if len(svg) > MAX_CACHED_SVG_CHARS:
+        return svg
+
+    with _svg_lock:
+        old = _rendered_svgs.pop(key, None)
+        if old is not None:
+            _rendered_svgs_size -= len(old)
+        _rendered_svgs[key] = svg
+        _rendered_svgs_size += len(svg)
+        while _rendered_svgs_size > MAX_CACHED_SVG_CHARS:
+            _, evicted = _rendered_svgs.popitem(last=False)
+            _rendered_svgs_size -= len(evicted)
+    return svg
@@ -2,40 +2,83 @@
 PDF viewing and processing API routes
 """
 
+import asyncio
+import os
 import tempfile
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Callable, Dict
 
 import fitz  # PyMuPDF
 from fastapi import HTTPException
-from fastapi.responses import Response
+from fastapi.responses import FileResponse, Response
 
 from .models import WorkspaceConfig
-from .pdf_processor import extract_page_markdown, render_page_svg
+from .pdf_processor import (
+    cached_document,
+    extract_page_markdown,
+    get_cached_image,
+    render_page_svg,
+)
 
+# 页面处理的进程数，0 表示在线程池中执行（仍受 PyMuPDF 全局锁串行化）
+PDF_WORKERS = int(os.getenv("INCREA_PDF_WORKERS", "0"))
 
-async def get_pdf_metadata(file_path: Path, path: str) -> Dict[str, Any]:
-    """获取PDF文件的元数据"""
-    try:
-        doc = fitz.open(file_path)
+_pdf_pool: ProcessPoolExecutor | None = None
+
+# 临时图片目录，启动时解析一次
+_TEMP_ROOT = Path(tempfile.gettempdir()).resolve()
+
+
+def _get_pdf_pool() -> ProcessPoolExecutor | None:
+    """按需创建页面处理进程池，每个进程各自缓存已打开的文档"""
+    global _pdf_pool
+    if PDF_WORKERS > 0 and _pdf_pool is None:
+        _pdf_pool = ProcessPoolExecutor(max_workers=PDF_WORKERS)
+    return _pdf_pool
+
+
+async def _run_page_task(func: Callable, *args):
+    """在进程池（或线程池）中执行页面处理，避免阻塞事件循环"""
+    pool = _get_pdf_pool()
+    if pool is None:
+        return await asyncio.to_thread(func, *args)
+    return await asyncio.get_running_loop().run_in_executor(pool, func, *args)
 
+
+def shutdown_pdf_pool() -> None:
+    """关闭页面处理进程池"""
+    global _pdf_pool
+    if _pdf_pool is not None:
+        _pdf_pool.shutdown(cancel_futures=True)
+        _pdf_pool = None
+
+
+def _read_pdf_metadata(file_path: Path) -> Dict[str, Any]:
+    """读取PDF元数据（同步，在线程中执行）"""
+    with cached_document(file_path) as doc:
         # 提取元数据
         metadata = doc.metadata
+        return {
+            "page_count": doc.page_count,
+            "title": metadata.get("title", ""),
+            "author": metadata.get("author", ""),
+            "subject": metadata.get("subject", ""),
+            "creator": metadata.get("creator", ""),
+            "producer": metadata.get("producer", ""),
+            "creation_date": metadata.get("creationDate", ""),
+            "modification_date": metadata.get("modDate", ""),
+            "encrypted": doc.is_encrypted,
+        }
+
 
+async def get_pdf_metadata(file_path: Path, path: str) -> Dict[str, Any]:
+    """获取PDF文件的元数据"""
+    try:
         return {
             "type": "pdf",
             "path": path,
-            "metadata": {
-                "page_count": doc.page_count,
-                "title": metadata.get("title", ""),
-                "author": metadata.get("author", ""),
-                "subject": metadata.get("subject", ""),
-                "creator": metadata.get("creator", ""),
-                "producer": metadata.get("producer", ""),
-                "creation_date": metadata.get("creationDate", ""),
-                "modification_date": metadata.get("modDate", ""),
-                "encrypted": doc.is_encrypted,
-            },
+            "metadata": await asyncio.to_thread(_read_pdf_metadata, file_path),
         }
     except Exception as e:
         # 如果无法读取PDF元数据，返回基本信息
@@ -53,7 +96,7 @@ def create_pdf_routes(app, workspace_config: WorkspaceConfig):
     async def get_pdf_page_content(repo: str, path: str, page: int):
         """获取PDF指定页面的Markdown内容"""
         # Find repository
-        repo_config = next((r for r in workspace_config.repos if r.name == repo), None)
+        repo_config = workspace_config.find_repo(repo)
         if not repo_config:
             raise HTTPException(
                 status_code=404, detail=f"Repository '{repo}' not found"
@@ -74,7 +117,9 @@ def create_pdf_routes(app, workspace_config: WorkspaceConfig):
 
         try:
             # 使用PDF处理器提取页面内容
-            result = extract_page_markdown(str(file_path), page)
+            result = await _run_page_task(
+                extract_page_markdown, str(file_path), page
+            )
 
             return {
                 "type": "markdown",
@@ -95,7 +140,7 @@ def create_pdf_routes(app, workspace_config: WorkspaceConfig):
     async def get_pdf_page_render(repo: str, path: str, page: int):
         """渲染PDF页面为SVG矢量图"""
         # Find repository
-        repo_config = next((r for r in workspace_config.repos if r.name == repo), None)
+        repo_config = workspace_config.find_repo(repo)
         if not repo_config:
             raise HTTPException(
                 status_code=404, detail=f"Repository '{repo}' not found"
@@ -115,7 +160,9 @@ def create_pdf_routes(app, workspace_config: WorkspaceConfig):
             raise HTTPException(status_code=400, detail="Page number must be >= 1")
 
         try:
-            svg_content = render_page_svg(str(file_path), page)
+            svg_content = await _run_page_task(
+                render_page_svg, str(file_path), page
+            )
             return Response(content=svg_content, media_type="image/svg+xml")
         except ValueError as e:
             raise HTTPException(status_code=400, detail=str(e))
@@ -124,8 +171,9 @@ def create_pdf_routes(app, workspace_config: WorkspaceConfig):
                 status_code=500, detail=f"Failed to render PDF page: {str(e)}"
             )
 
+    # 同步函数，由 FastAPI 放到线程池中执行
     @app.get("/api/pdf/extract-region")
-    async def extract_pdf_region(
+    def extract_pdf_region(
         repo: str,
         path: str,
         page: int,
@@ -135,7 +183,7 @@ def create_pdf_routes(app, workspace_config: WorkspaceConfig):
         y1: float,
     ):
         """提取PDF页面指定矩形区域内的文字"""
-        repo_config = next((r for r in workspace_config.repos if r.name == repo), None)
+        repo_config = workspace_config.find_repo(repo)
         if not repo_config:
             raise HTTPException(
                 status_code=404, detail=f"Repository '{repo}' not found"
@@ -153,20 +201,20 @@ def create_pdf_routes(app, workspace_config: WorkspaceConfig):
             raise HTTPException(status_code=400, detail="Page number must be >= 1")
 
         try:
-            doc = fitz.open(file_path)
-            if page > doc.page_count:
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"Page {page} exceeds total pages ({doc.page_count})",
-                )
-            pdf_page = doc[page - 1]
-            clip = fitz.Rect(x0, y0, x1, y1)
-            text = pdf_page.get_text("text", clip=clip).strip()
-            return {
-                "text": text,
-                "page_width": pdf_page.rect.width,
-                "page_height": pdf_page.rect.height,
-            }
+            with cached_document(file_path) as doc:
+                if page > doc.page_count:
+                    raise HTTPException(
+                        status_code=400,
+                        detail=f"Page {page} exceeds total pages ({doc.page_count})",
+                    )
+                pdf_page = doc[page - 1]
+                clip = fitz.Rect(x0, y0, x1, y1)
+                text = pdf_page.get_text("text", clip=clip).strip()
+                return {
+                    "text": text,
+                    "page_width": pdf_page.rect.width,
+                    "page_height": pdf_page.rect.height,
+                }
         except HTTPException:
             raise
         except Exception as e:
@@ -178,31 +226,25 @@ def create_pdf_routes(app, workspace_config: WorkspaceConfig):
     @app.get("/api/temp-image/{filepath:path}")
     async def get_temp_image(filepath: str):
         """获取PDF提取的临时图片"""
+        # 优先使用内存中已提取的图片
+        image_data = get_cached_image(filepath)
+        if image_data is not None:
+            return Response(content=image_data, media_type="image/png")
+
         # 验证文件路径安全性（防止路径遍历）
-        if ".." in filepath or filepath.startswith("/") or filepath.startswith("\\"):
+        if ".." in filepath or filepath.startswith(("/", "\\")):
             raise HTTPException(status_code=400, detail="Invalid filepath")
 
-        # 构建临时文件路径
-        temp_dir = Path(tempfile.gettempdir())
-        img_path = temp_dir / filepath
-
-        # 确保路径在临时目录内（安全检查）
+        # 确保解析符号链接后仍在临时目录内（安全检查）
         try:
-            img_path = img_path.resolve()
-            if not str(img_path).startswith(str(temp_dir.resolve())):
-                raise HTTPException(status_code=400, detail="Invalid filepath")
-        except Exception:
+            img_path = (_TEMP_ROOT / filepath).resolve()
+        except (OSError, RuntimeError):
+            raise HTTPException(status_code=400, detail="Invalid filepath")
+        if not img_path.is_relative_to(_TEMP_ROOT):
             raise HTTPException(status_code=400, detail="Invalid filepath")
 
         if not img_path.exists() or not img_path.is_file():
             raise HTTPException(status_code=404, detail="Image not found")
 
-        # 读取并返回图片
-        try:
-            with open(img_path, "rb") as f:
-                image_data = f.read()
-            return Response(content=image_data, media_type="image/png")
-        except Exception as e:
-            raise HTTPException(
-                status_code=500, detail=f"Failed to read image: {str(e)}"
-            )
+        # FileResponse 走 sendfile，并带上 ETag/Last-Modified
+        return FileResponse(img_path, media_type="image/png")
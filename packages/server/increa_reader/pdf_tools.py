@@ -2,18 +2,30 @@
 PDF Tools using Claude Agent SDK @tool decorator
 """
 
-import json
 import os
 import tempfile
 import uuid
+from bisect import bisect_left
+from operator import itemgetter
 from pathlib import Path
-from typing import Any
+from typing import Any, Iterable
 
 import fitz  # PyMuPDF
+import orjson
 from claude_agent_sdk import tool
 
+# Same flags page.search_for uses when it builds its own TextPage
+_SEARCH_FLAGS = (
+    fitz.TEXT_DEHYPHENATE
+    | fitz.TEXT_PRESERVE_WHITESPACE
+    | fitz.TEXT_PRESERVE_LIGATURES
+    | fitz.TEXT_MEDIABOX_CLIP
+)
+
 # Global document store
 documents: dict[str, fitz.Document] = {}
+# PNG renders per (doc_id, page, dpi), dropped when the document is closed
+rendered_pages: dict[tuple[str, int, int], str] = {}
 
 
 def _validate_doc_id(doc_id: str) -> fitz.Document:
@@ -29,21 +41,45 @@ def _validate_page_range(doc: fitz.Document, page: int) -> None:
         raise ValueError(f"Page {page} out of range (1-{doc.page_count})")
 
 
-def _is_allowed_path(path: str) -> bool:
-    """Check if path is allowed (workspace directories or temp)"""
-    path_obj = Path(path).resolve()
+def _clip_text(
+    words: list[tuple], tops: list[float], max_height: float, clip: fitz.Rect
+) -> str:
+    """Join the whole words lying mostly inside clip, one line per text line
+
+    words are TextPage word tuples sorted by their top edge, listed in tops.
+    """
+    lo = bisect_left(tops, clip.y0 - max_height)
+    hi = bisect_left(tops, clip.y1)
+    inside = [
+        word
+        for word in words[lo:hi]
+        if abs(clip & word[:4]) >= 0.5 * abs(fitz.Rect(word[:4]))
+    ]
+    inside.sort(key=itemgetter(5, 6, 7))
+
+    lines: dict[tuple[int, int], list[str]] = {}
+    for word in inside:
+        lines.setdefault((word[5], word[6]), []).append(word[4])
+    return "\n".join(" ".join(line) for line in lines.values())
 
-    # Allow workspace directories from environment
-    workspace_paths = os.getenv("INCREA_REPO", "").split(":")
-    for workspace in workspace_paths:
-        if workspace and path_obj.is_relative_to(Path(workspace).resolve()):
-            return True
 
-    # Allow temp directory
-    if path_obj.is_relative_to(Path(tempfile.gettempdir()).resolve()):
-        return True
+def set_allowed_roots(repo_roots: Iterable[str]) -> None:
+    """Allow the given workspace roots plus the temp dir, resolved once"""
+    global _ALLOWED_ROOTS
+    _ALLOWED_ROOTS = tuple(Path(root).resolve() for root in repo_roots) + (
+        Path(tempfile.gettempdir()).resolve(),
+    )
 
-    return False
+
+# Seeded from INCREA_REPO; the chat routes replace it with the configured repos
+_ALLOWED_ROOTS: tuple[Path, ...] = ()
+set_allowed_roots(root for root in os.getenv("INCREA_REPO", "").split(":") if root)
+
+
+def _is_allowed_path(path: str) -> bool:
+    """Check if path is allowed (workspace directories or temp)"""
+    path_obj = Path(path).resolve()
+    return any(path_obj.is_relative_to(root) for root in _ALLOWED_ROOTS)
 
 
 @tool("open_pdf", "Open a PDF file and return a document ID", {"path": str})
@@ -113,10 +149,14 @@ async def render_page_png(args: dict[str, Any]) -> dict[str, Any]:
         dpi = args.get("dpi", 144)
         _validate_page_range(doc, page)
 
-        pix = doc[page - 1].get_pixmap(dpi=dpi)
-        filename = f"pdf_page_{page}_{uuid.uuid4().hex[:8]}.png"
-        temp_file = Path(tempfile.gettempdir()) / filename
-        pix.save(temp_file)
+        # Reuse an earlier render of the same page while its file is still there
+        key = (args["doc_id"], page, dpi)
+        filename = rendered_pages.get(key)
+        if filename is None or not (Path(tempfile.gettempdir()) / filename).is_file():
+            pix = doc[page - 1].get_pixmap(dpi=dpi)
+            filename = f"pdf_page_{page}_{uuid.uuid4().hex[:8]}.png"
+            pix.save(Path(tempfile.gettempdir()) / filename)
+            rendered_pages[key] = filename
 
         # Return markdown image format for browser access
         markdown_img = f"![PDF Page {page}](/api/temp-image/{filename})"
@@ -154,11 +194,20 @@ async def search_text(args: dict[str, Any]) -> dict[str, Any]:
 
         for page_num in range(doc.page_count):
             page = doc[page_num]
-            for inst in page.search_for(query_text):
+            # Parse the page's text once for both the search and the snippets
+            textpage = page.get_textpage(flags=_SEARCH_FLAGS)
+            hits = page.search_for(query_text, textpage=textpage)
+            if not hits:
+                continue
+            # Sorted by top edge so each snippet only scans nearby words
+            words = sorted(textpage.extractWORDS(), key=itemgetter(1))
+            tops = [word[1] for word in words]
+            max_height = max((word[3] - word[1] for word in words), default=0)
+            for inst in hits[: max_hits - len(results)]:
                 surrounding_rect = fitz.Rect(
                     inst.x0 - 50, inst.y0 - 20, inst.x1 + 50, inst.y1 + 20
                 )
-                surrounding_text = page.get_text("text", clip=surrounding_rect)
+                surrounding_text = _clip_text(words, tops, max_height, surrounding_rect)
                 results.append(
                     {
                         "page": page_num + 1,
@@ -166,8 +215,6 @@ async def search_text(args: dict[str, Any]) -> dict[str, Any]:
                         "bbox": [inst.x0, inst.y0, inst.x1, inst.y1],
                     }
                 )
-                if len(results) >= max_hits:
-                    break
             if len(results) >= max_hits:
                 break
 
@@ -175,7 +222,7 @@ async def search_text(args: dict[str, Any]) -> dict[str, Any]:
             "content": [
                 {
                     "type": "text",
-                    "text": json.dumps(results, indent=2, ensure_ascii=False),
+                    "text": orjson.dumps(results).decode(),
                 }
             ]
         }
@@ -190,6 +237,8 @@ async def close_pdf(args: dict[str, Any]) -> dict[str, Any]:
         doc = _validate_doc_id(args["doc_id"])
         doc.close()
         del documents[args["doc_id"]]
+        for key in [key for key in rendered_pages if key[0] == args["doc_id"]]:
+            del rendered_pages[key]
         return {"content": [{"type": "text", "text": "Document closed successfully"}]}
     except ValueError as e:
         return {"content": [{"type": "text", "text": str(e)}], "is_error": True}
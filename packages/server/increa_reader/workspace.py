@@ -11,6 +11,11 @@ from .models import RepoItem, TreeNode, WorkspaceConfig
 
 DEFAULT_EXCLUDES = ["node_modules", ".*", "*.log"]
 
+# Environment fallbacks for the API settings; main.py loads .env before this import
+_ENV_BASE_URL = os.getenv("ANTHROPIC_BASE_URL")
+_ENV_AUTH_TOKEN = os.getenv("ANTHROPIC_AUTH_TOKEN")
+_ENV_API_KEY = os.getenv("ANTHROPIC_API_KEY", "")
+
 
 def get_config_path() -> Path:
     return Path.home() / ".increa-reader" / "config.json"
@@ -46,20 +51,40 @@ def load_api_settings() -> dict:
     return load_raw_config().get("api_settings", {})
 
 
+# Last SDK env built, keyed by the config.json (mtime, size) it was read from
+_sdk_env_cache: tuple[tuple[int, int] | None, dict[str, str]] | None = None
+
+
+def _config_stamp() -> tuple[int, int] | None:
+    try:
+        stat = get_config_path().stat()
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
 def build_sdk_env() -> dict[str, str]:
-    """Build env dict for Claude SDK, filtering out None values"""
+    """Build env dict for Claude SDK, filtering out None values
+
+    The dict is shared between calls until config.json changes; treat it as read-only.
+    """
+    global _sdk_env_cache
+    stamp = _config_stamp()
+    if _sdk_env_cache is not None and _sdk_env_cache[0] == stamp:
+        return _sdk_env_cache[1]
+
     api_settings = load_api_settings()
-    return {
+    env = {
         k: v
         for k, v in {
-            "ANTHROPIC_BASE_URL": api_settings.get("base_url")
-            or os.getenv("ANTHROPIC_BASE_URL"),
-            "ANTHROPIC_AUTH_TOKEN": os.getenv("ANTHROPIC_AUTH_TOKEN"),
-            "ANTHROPIC_API_KEY": api_settings.get("api_key")
-            or os.getenv("ANTHROPIC_API_KEY", ""),
+            "ANTHROPIC_BASE_URL": api_settings.get("base_url") or _ENV_BASE_URL,
+            "ANTHROPIC_AUTH_TOKEN": _ENV_AUTH_TOKEN,
+            "ANTHROPIC_API_KEY": api_settings.get("api_key") or _ENV_API_KEY,
         }.items()
         if v is not None
     }
+    _sdk_env_cache = (stamp, env)
+    return env
 
 
 def save_api_settings(settings: dict) -> None:
@@ -110,6 +135,10 @@ def load_workspace_config() -> WorkspaceConfig:
 
 def is_text_file(content: bytes) -> bool:
     """Check if file content is text-based"""
+    # Text files have no NUL bytes, while most binary formats do early on;
+    # the membership test is a C-level memchr
+    if b"\x00" in content:
+        return False
     try:
         content.decode("utf-8")
         return True
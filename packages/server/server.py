@@ -9,11 +9,17 @@ import uvicorn
 
 if __name__ == "__main__":
     port = int(os.getenv("PORT", 3000))
+    # Auto-reload spawns a file watcher; only the dev script turns it on
+    reload = os.getenv("RELOAD", "false").lower() == "true"
     uvicorn.run(
         "increa_reader.main:app",
         host="0.0.0.0",
         port=port,
-        reload=True,
+        reload=reload,
+        # uvicorn[standard] brings uvloop (not on Windows) and httptools; "auto"
+        # uses them when installed and falls back to asyncio and h11 otherwise
+        loop="auto",
+        http="auto",
         log_level="info",
         timeout_graceful_shutdown=5,
     )
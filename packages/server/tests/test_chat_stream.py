@@ -0,0 +1,266 @@
+import asyncio
+import json
+import tempfile
+import time
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+from increa_reader import chat, pdf_tools
+from increa_reader.chat import _coalesce_events
+from increa_reader.main import create_app
+from increa_reader.models import RepoItem
+
+
+def text_delta(text: str, index: int = 0) -> dict:
+    return {
+        "type": "stream_event",
+        "event": {
+            "type": "content_block_delta",
+            "index": index,
+            "delta": {"type": "text_delta", "text": text},
+        },
+    }
+
+
+def parse_frames(chunk: bytes) -> list[dict]:
+    return [
+        json.loads(frame[len(b"data: ") :])
+        for frame in chunk.split(b"\n\n")
+        if frame
+    ]
+
+
+@pytest.mark.asyncio
+async def test_coalesce_events_merges_text_deltas_per_content_block():
+    async def events():
+        for payload in [
+            text_delta("Hel"),
+            text_delta("lo"),
+            text_delta("你好", index=1),
+            {"type": "assistant", "content": "Hello"},
+            text_delta("!"),
+        ]:
+            yield payload
+
+    chunks = [chunk async for chunk in _coalesce_events(events(), delay=1.0)]
+
+    assert len(chunks) == 1
+    frames = parse_frames(chunks[0])
+    assert [frame["type"] for frame in frames] == [
+        "stream_event",
+        "stream_event",
+        "assistant",
+        "stream_event",
+    ]
+    assert [
+        frame["event"]["delta"]["text"]
+        for frame in frames
+        if frame["type"] == "stream_event"
+    ] == ["Hello", "你好", "!"]
+
+
+@pytest.mark.asyncio
+async def test_coalesce_events_reraises_stream_errors():
+    async def events():
+        yield text_delta("partial")
+        raise RuntimeError("stream failed")
+
+    chunks = []
+    with pytest.raises(RuntimeError, match="stream failed"):
+        async for chunk in _coalesce_events(events()):
+            chunks.append(chunk)
+
+    assert parse_frames(b"".join(chunks))[0]["event"]["delta"]["text"] == "partial"
+
+
+def test_chat_save_responds_before_the_semantic_rename(tmp_path, monkeypatch):
+    monkeypatch.setenv("CHAT_LOGS_DIR", str(tmp_path / "logs"))
+    monkeypatch.setenv("HOME", str(tmp_path))
+
+    async def slow_name(messages):
+        await asyncio.sleep(0.2)
+        return "语义文件名"
+
+    monkeypatch.setattr(chat, "generate_semantic_filename", slow_name)
+
+    with TestClient(create_app()) as client:
+        started = time.monotonic()
+        response = client.post(
+            "/api/chat/save",
+            json={
+                "sessionId": "abcdef123456",
+                "messages": [{"role": "user", "content": "hi", "timestamp": 0}],
+            },
+        )
+        assert time.monotonic() - started < 0.2
+
+        assert response.status_code == 200
+        result = response.json()
+        assert result["filename"].endswith("_abcdef12.md")
+        assert result["renamePending"] is True
+        assert Path(result["filepath"]).read_text(encoding="utf-8").startswith(
+            "# Chat Session: abcdef123456"
+        )
+
+        status_url = f"/api/chat/save/{result['filename']}"
+        assert client.get(status_url).json()["renamePending"] is True
+        while (status := client.get(status_url).json())["renamePending"]:
+            time.sleep(0.02)
+
+    assert status["filename"].endswith("_语义文件名.md")
+    assert [p.name for p in (tmp_path / "logs").iterdir()] == [status["filename"]]
+
+
+def test_chat_logs_dir_is_created_once_and_restored_if_removed(tmp_path, monkeypatch):
+    logs_dir = tmp_path / "logs"
+    monkeypatch.setenv("CHAT_LOGS_DIR", str(logs_dir))
+
+    async def no_name(messages):
+        return None
+
+    monkeypatch.setattr(chat, "generate_semantic_filename", no_name)
+    client = TestClient(create_app())
+    assert logs_dir.is_dir()
+
+    logs_dir.rmdir()
+    response = client.post(
+        "/api/chat/save",
+        json={"sessionId": "abcdef123456", "messages": []},
+    )
+    assert response.status_code == 200
+    assert Path(response.json()["filepath"]).is_file()
+
+
+def test_chat_save_status_rejects_unknown_logs(tmp_path, monkeypatch):
+    monkeypatch.setenv("CHAT_LOGS_DIR", str(tmp_path / "logs"))
+    client = TestClient(create_app())
+
+    assert client.get("/api/chat/save/missing.md").status_code == 404
+
+
+class FakeClient:
+    """Stands in for ClaudeSDKClient; records connects and queries"""
+
+    instances: list["FakeClient"] = []
+    fail_query = False
+
+    def __init__(self, options=None):
+        self.options = options
+        self.connected = False
+        self.queries: list[str] = []
+        FakeClient.instances.append(self)
+
+    async def connect(self):
+        self.connected = True
+
+    async def disconnect(self):
+        self.connected = False
+
+    async def query(self, prompt):
+        if FakeClient.fail_query:
+            raise RuntimeError("query failed")
+        self.queries.append(prompt)
+
+    async def receive_response(self):
+        return
+        yield
+
+
+@pytest.fixture
+def fake_clients(monkeypatch):
+    FakeClient.instances = []
+    FakeClient.fail_query = False
+    monkeypatch.setattr(chat, "ClaudeSDKClient", FakeClient)
+    monkeypatch.setattr(chat, "idle_clients", chat.OrderedDict())
+    return FakeClient
+
+
+@pytest.mark.asyncio
+async def test_released_client_is_reused_for_the_same_key(fake_clients):
+    client = await chat.acquire_client(("s1", "opts"), None)
+    await chat.release_client(("s1", "opts"), client)
+
+    assert await chat.acquire_client(("s1", "opts"), None) is client
+    other = await chat.acquire_client(("s1", "other-opts"), None)
+    assert other is not client
+    assert len(fake_clients.instances) == 2
+
+
+@pytest.mark.asyncio
+async def test_release_evicts_and_disconnects_least_recently_used(fake_clients):
+    clients = []
+    for i in range(chat.MAX_IDLE_CLIENTS + 1):
+        client = await chat.acquire_client((f"s{i}",), None)
+        await chat.release_client((f"s{i}",), client)
+        clients.append(client)
+
+    assert len(chat.idle_clients) == chat.MAX_IDLE_CLIENTS
+    assert ("s0",) not in chat.idle_clients
+    assert not clients[0].connected
+    assert all(client.connected for client in clients[1:])
+
+    # Releasing a second client under a held key disconnects the stale one
+    replacement = await chat.acquire_client(("s-new",), None)
+    await chat.release_client(("s1",), replacement)
+    assert not clients[1].connected
+    assert chat.idle_clients[("s1",)] is replacement
+
+
+def _chat_client(tmp_path, monkeypatch, *repos):
+    for repo in repos:
+        repo.mkdir()
+    monkeypatch.setenv("INCREA_REPO", ":".join(str(repo) for repo in repos))
+    monkeypatch.setenv("HOME", str(tmp_path))
+    app = create_app()
+    return TestClient(app), app.state.workspace_config
+
+
+def test_chat_query_reuses_client_only_while_options_match(
+    tmp_path, monkeypatch, fake_clients
+):
+    first, second = tmp_path / "first", tmp_path / "second"
+    client, workspace_config = _chat_client(tmp_path, monkeypatch, first, second)
+    payload = {"prompt": "hi", "sessionId": "s1"}
+
+    assert client.post("/api/chat/query", json=payload, params={"batch_ms": 0}).status_code == 200
+    assert client.post("/api/chat/query", json=payload, params={"batch_ms": 0}).status_code == 200
+    assert len(fake_clients.instances) == 1
+
+    # Dropping a repo keeps the cwd but shrinks add_dirs; the idle client
+    # still has access to the old directories and must not be reused
+    workspace_config.replace_repos([RepoItem(name="first", root=str(first))])
+    assert client.post("/api/chat/query", json=payload, params={"batch_ms": 0}).status_code == 200
+    assert len(fake_clients.instances) == 2
+    assert list(fake_clients.instances[1].options.add_dirs) == [str(first)]
+
+
+def test_chat_query_limits_pdf_tools_to_configured_repos(
+    tmp_path, monkeypatch, fake_clients
+):
+    first, second = tmp_path / "first", tmp_path / "second"
+    client, workspace_config = _chat_client(tmp_path, monkeypatch, first)
+    second.mkdir()
+    # Keep the temp dir (always allowed) away from the repos under tmp_path
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path / "tmp"))
+    monkeypatch.setattr(pdf_tools, "_ALLOWED_ROOTS", ())
+    workspace_config.replace_repos([RepoItem(name="second", root=str(second))])
+
+    payload = {"prompt": "hi", "sessionId": "s1"}
+    assert client.post("/api/chat/query", json=payload, params={"batch_ms": 0}).status_code == 200
+
+    assert pdf_tools._is_allowed_path(str(second / "doc.pdf"))
+    assert not pdf_tools._is_allowed_path(str(first / "doc.pdf"))
+
+
+def test_chat_query_drops_client_after_an_error(tmp_path, monkeypatch, fake_clients):
+    client, _ = _chat_client(tmp_path, monkeypatch, tmp_path / "repo")
+    fake_clients.fail_query = True
+    payload = {"prompt": "hi", "sessionId": "s1"}
+
+    response = client.post("/api/chat/query", json=payload, params={"batch_ms": 0})
+
+    assert '"type":"error"' in response.text
+    assert not chat.idle_clients
+    assert not fake_clients.instances[0].connected
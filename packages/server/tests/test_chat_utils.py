@@ -0,0 +1,116 @@
+import asyncio
+
+import pytest
+from claude_agent_sdk import AssistantMessage, TextBlock
+from fastapi.testclient import TestClient
+
+from increa_reader import chat, chat_utils
+from increa_reader.chat_utils import generate_semantic_filename
+from increa_reader.main import create_app
+
+
+@pytest.mark.asyncio
+async def test_semantic_filename_uses_first_user_message(monkeypatch):
+    async def no_llm():
+        raise AssertionError("short user message should not reach the LLM")
+
+    monkeypatch.setattr(chat_utils, "_acquire_filename_client", no_llm)
+    messages = [
+        {"role": "system", "content": "Model switched to claude-haiku"},
+        {"role": "error", "content": "Failed to connect"},
+        {"role": "user", "content": "PDF 表格解析"},
+        {"role": "assistant", "content": "好的"},
+    ]
+
+    assert await generate_semantic_filename(messages) == "PDF 表格解析"
+
+
+@pytest.mark.asyncio
+async def test_semantic_filename_without_user_message_asks_the_llm(monkeypatch):
+    calls = []
+
+    async def failing_client():
+        calls.append(True)
+        raise RuntimeError("CLI unavailable")
+
+    monkeypatch.setattr(chat_utils, "_acquire_filename_client", failing_client)
+    messages = [{"role": "system", "content": "Available commands: /help"}]
+
+    assert await generate_semantic_filename(messages) is None
+    assert calls == [True]
+
+
+class FakeFilenameClient:
+    """Stands in for ClaudeSDKClient in the filename helpers"""
+
+    instances: list["FakeFilenameClient"] = []
+    fail_query = False
+
+    def __init__(self, options=None):
+        self.connected = False
+        FakeFilenameClient.instances.append(self)
+
+    async def connect(self):
+        self.connected = True
+
+    async def disconnect(self):
+        self.connected = False
+
+    async def query(self, prompt):
+        if FakeFilenameClient.fail_query:
+            raise RuntimeError("query failed")
+
+    async def receive_response(self):
+        yield AssistantMessage(content=[TextBlock(text="长对话的主题")], model="test")
+
+
+LONG_CHAT = [{"role": "user", "content": "x" * 200}]
+
+
+@pytest.fixture
+def fake_filename_clients(monkeypatch):
+    FakeFilenameClient.instances = []
+    FakeFilenameClient.fail_query = False
+    monkeypatch.setattr(chat_utils, "ClaudeSDKClient", FakeFilenameClient)
+    yield FakeFilenameClient
+    spare = chat_utils._take_spare()
+    if spare is not None:
+        spare[1].cancel()
+
+
+@pytest.mark.asyncio
+async def test_spare_filename_client_expires_when_idle(monkeypatch, fake_filename_clients):
+    monkeypatch.setattr(chat_utils, "SPARE_IDLE_TIMEOUT", 0.05)
+
+    assert await generate_semantic_filename(LONG_CHAT) == "长对话的主题"
+
+    await asyncio.sleep(0.02)
+    first, spare = fake_filename_clients.instances
+    assert not first.connected
+    assert spare.connected
+    await asyncio.sleep(0.1)
+    assert chat_utils._spare_client is None
+    assert not spare.connected
+
+
+@pytest.mark.asyncio
+async def test_failed_filename_query_does_not_spawn_a_spare(fake_filename_clients):
+    fake_filename_clients.fail_query = True
+
+    assert await generate_semantic_filename(LONG_CHAT) is None
+    assert len(fake_filename_clients.instances) == 1
+    assert chat_utils._spare_client is None
+
+
+def test_shutdown_closes_filename_clients(tmp_path, monkeypatch):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    closed = []
+
+    async def record_close():
+        closed.append(True)
+
+    monkeypatch.setattr(chat, "close_filename_clients", record_close)
+
+    with TestClient(create_app()):
+        assert closed == []
+    assert closed == [True]
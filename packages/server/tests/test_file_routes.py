@@ -0,0 +1,168 @@
+from fastapi.testclient import TestClient
+
+from increa_reader.main import create_app
+
+
+def _build_client(tmp_path, monkeypatch):
+    repo_root = tmp_path / "demo-repo"
+    repo_root.mkdir()
+
+    monkeypatch.setenv("INCREA_REPO", str(repo_root))
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "test-key")
+    monkeypatch.setenv("HOME", str(tmp_path))
+
+    return TestClient(create_app()), repo_root
+
+
+def test_views_detects_text_and_binary_files(tmp_path, monkeypatch):
+    client, repo_root = _build_client(tmp_path, monkeypatch)
+    # Long enough that the text spans past the sniffed head
+    text = "第一行\n" + "x" * 10000 + "\nend\n"
+    (repo_root / "notes.txt").write_text(text, encoding="utf-8")
+    (repo_root / "image.bin").write_bytes(b"\x89PNG\r\n\x1a\n" + bytes(range(256)) * 40)
+
+    response = client.get("/api/views/demo-repo/notes.txt")
+    assert response.status_code == 200
+    assert response.json() == {"type": "text", "content": text, "filename": "notes.txt"}
+
+    response = client.get("/api/views/demo-repo/image.bin")
+    assert response.status_code == 200
+    assert response.json()["type"] == "binary"
+
+    response = client.get("/api/views/demo-repo/notes.txt", params={"raw": "true"})
+    assert response.status_code == 200
+    assert response.headers["x-filename"] == "notes.txt"
+    assert response.headers["cache-control"] == "no-cache"
+    assert response.text == text
+
+    (repo_root / "notes.txt").write_text("edited\n", encoding="utf-8")
+    response = client.get(
+        "/api/views/demo-repo/notes.txt",
+        params={"raw": "true"},
+        headers={"If-None-Match": response.headers["etag"]},
+    )
+    assert response.status_code == 200
+    assert response.text == "edited\n"
+
+    response = client.get("/api/views/demo-repo/image.bin", params={"raw": "true"})
+    assert response.status_code == 415
+
+
+def test_preview_reads_unknown_text_files_as_code(tmp_path, monkeypatch):
+    client, repo_root = _build_client(tmp_path, monkeypatch)
+    (repo_root / "NOTES").write_text("plain text\n", encoding="utf-8")
+
+    response = client.get("/api/preview", params={"repo": "demo-repo", "path": "NOTES"})
+    assert response.status_code == 200
+    assert response.json() == {"type": "code", "lang": "text", "body": "plain text\n"}
+
+
+def test_preview_replaces_invalid_utf8_in_known_text_files(tmp_path, monkeypatch):
+    client, repo_root = _build_client(tmp_path, monkeypatch)
+    (repo_root / "server.log").write_bytes(b"caf\xe9 opened\n")
+
+    response = client.get("/api/preview", params={"repo": "demo-repo", "path": "server.log"})
+    assert response.status_code == 200
+    assert response.json() == {"type": "code", "lang": "text", "body": "caf\ufffd opened\n"}
+
+
+def test_preview_links_large_text_files_to_raw_body(tmp_path, monkeypatch):
+    client, repo_root = _build_client(tmp_path, monkeypatch)
+    body = "# Title\n\n" + "段落 paragraph\n" * 10000
+    (repo_root / "big notes.md").write_text(body, encoding="utf-8")
+
+    response = client.get("/api/preview", params={"repo": "demo-repo", "path": "big notes.md"})
+    assert response.status_code == 200
+    preview = response.json()
+    assert preview["type"] == "markdown"
+    assert "body" not in preview
+
+    response = client.get(preview["bodyUrl"])
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "text/plain; charset=utf-8"
+    assert response.text == body
+
+    # Unknown extensions only have their head sniffed before linking the body
+    (repo_root / "server.out").write_text(body, encoding="utf-8")
+    response = client.get("/api/preview", params={"repo": "demo-repo", "path": "server.out"})
+    assert response.json() == {
+        "type": "code",
+        "lang": "text",
+        "bodyUrl": "/api/preview/raw?repo=demo-repo&path=server.out",
+    }
+
+
+def test_file_routes_reject_paths_outside_the_repo(tmp_path, monkeypatch):
+    client, repo_root = _build_client(tmp_path, monkeypatch)
+    (tmp_path / "secret.txt").write_text("secret", encoding="utf-8")
+
+    response = client.get("/api/preview", params={"repo": "demo-repo", "path": "../secret.txt"})
+    assert response.status_code == 403
+
+    response = client.get("/api/views/demo-repo/..%2Fsecret.txt")
+    assert response.status_code == 403
+
+    response = client.delete("/api/files/demo-repo/..%2Fsecret.txt")
+    assert response.status_code == 403
+    assert (tmp_path / "secret.txt").exists()
+
+
+def test_preview_cache_and_etag_follow_file_changes(tmp_path, monkeypatch):
+    client, repo_root = _build_client(tmp_path, monkeypatch)
+    note = repo_root / "note.md"
+    note.write_text("first", encoding="utf-8")
+    params = {"repo": "demo-repo", "path": "note.md"}
+
+    response = client.get("/api/preview", params=params)
+    assert response.json()["body"] == "first"
+    assert client.get("/api/preview", params=params).json()["body"] == "first"
+
+    etag = response.headers["etag"]
+    response = client.get("/api/preview", params=params, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+
+    note.write_text("second edit", encoding="utf-8")
+    response = client.get("/api/preview", params=params, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()["body"] == "second edit"
+
+
+def test_preview_body_is_revalidated_after_edits(tmp_path, monkeypatch):
+    client, repo_root = _build_client(tmp_path, monkeypatch)
+    big = repo_root / "big.md"
+    big.write_text("first\n" * 20000, encoding="utf-8")
+    params = {"repo": "demo-repo", "path": "big.md"}
+
+    body_url = client.get("/api/preview", params=params).json()["bodyUrl"]
+    response = client.get(body_url)
+    assert response.headers["cache-control"] == "no-cache"
+    assert response.text == "first\n" * 20000
+
+    big.write_text("second\n" * 20000, encoding="utf-8")
+    assert client.get("/api/preview", params=params).json()["bodyUrl"] == body_url
+    response = client.get(
+        body_url,
+        headers={
+            "If-None-Match": response.headers["etag"],
+            "If-Modified-Since": response.headers["last-modified"],
+        },
+    )
+    assert response.status_code == 200
+    assert response.text == "second\n" * 20000
+
+
+def test_delete_file_removes_files_but_not_directories(tmp_path, monkeypatch):
+    client, repo_root = _build_client(tmp_path, monkeypatch)
+    (repo_root / "docs").mkdir()
+    (repo_root / "docs" / "old.md").write_text("old", encoding="utf-8")
+
+    response = client.delete("/api/files/demo-repo/docs")
+    assert response.status_code == 400
+
+    response = client.delete("/api/files/demo-repo/docs/old.md")
+    assert response.status_code == 200
+    assert response.json() == {"success": True, "path": "docs/old.md"}
+    assert not (repo_root / "docs" / "old.md").exists()
+
+    response = client.delete("/api/files/demo-repo/docs/old.md")
+    assert response.status_code == 404
@@ -1,3 +1,5 @@
+import asyncio
+
 import pytest
 
 from increa_reader import frontend_tools
@@ -40,3 +42,19 @@ def test_frontend_tools_exports_note_reader_tools():
 
     assert "get_document_notes" in tool_names
     assert "get_visible_notes" in tool_names
+
+
+@pytest.mark.asyncio
+async def test_frontend_tool_wrapper_round_trips_through_call_id():
+    call = asyncio.create_task(frontend_tools.frontend_tool_wrapper("get_headings"))
+
+    request = await frontend_tools.frontend_tool_queue.get()
+    assert request["name"] == "get_headings"
+    assert isinstance(request["call_id"], int)
+
+    frontend_tools.complete_tool_call(request["call_id"], result=[{"text": "Intro"}])
+
+    result = await call
+    assert result["content"][0]["type"] == "text"
+    assert "Intro" in result["content"][0]["text"]
+    assert request["call_id"] not in frontend_tools.pending_tool_calls
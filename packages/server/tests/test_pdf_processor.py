@@ -3,9 +3,11 @@
 """
 
 import asyncio
+import shutil
 from pathlib import Path
 
-from increa_reader.pdf_processor import extract_page_markdown
+from increa_reader import pdf_processor
+from increa_reader.pdf_processor import extract_page_markdown, render_page_svg
 
 
 async def test_pdf_processor():
@@ -28,5 +30,35 @@ async def test_pdf_processor():
         print(f"处理失败: {e}")
 
 
+def test_render_page_svg_reuses_cached_render():
+    pdf_path = Path(__file__).parent / "test_document.pdf"
+
+    svg = render_page_svg(str(pdf_path), 1)
+
+    assert svg.lstrip().startswith("<svg")
+    assert render_page_svg(str(pdf_path), 1) is svg
+
+
+def test_render_page_svg_cache_is_bounded_by_size(tmp_path, monkeypatch):
+    pdf_path = Path(__file__).parent / "test_document.pdf"
+    copy_path = tmp_path / "copy.pdf"
+    shutil.copy(pdf_path, copy_path)
+    monkeypatch.setattr(pdf_processor, "_rendered_svgs", pdf_processor.OrderedDict())
+    monkeypatch.setattr(pdf_processor, "_rendered_svgs_size", 0)
+
+    svg = render_page_svg(str(pdf_path), 1)
+    monkeypatch.setattr(pdf_processor, "MAX_CACHED_SVG_CHARS", len(svg) + 1)
+
+    # Rendering the copy evicts the original to stay within the budget
+    render_page_svg(str(copy_path), 1)
+    assert [key[0] for key in pdf_processor._rendered_svgs] == [str(copy_path)]
+    assert pdf_processor._rendered_svgs_size == len(svg)
+
+    # An SVG larger than the whole budget is returned but not cached
+    monkeypatch.setattr(pdf_processor, "MAX_CACHED_SVG_CHARS", len(svg) - 1)
+    render_page_svg(str(pdf_path), 1)
+    assert [key[0] for key in pdf_processor._rendered_svgs] == [str(copy_path)]
+
+
 if __name__ == "__main__":
     asyncio.run(test_pdf_processor())
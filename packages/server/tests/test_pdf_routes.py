@@ -0,0 +1,33 @@
+import shutil
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+from increa_reader.main import create_app
+
+TEST_PDF = Path(__file__).parent / "test_document.pdf"
+
+
+def test_pdf_routes_follow_repo_config_updates(tmp_path, monkeypatch):
+    first = tmp_path / "first"
+    second = tmp_path / "second"
+    for root in (first, second):
+        root.mkdir()
+        shutil.copy(TEST_PDF, root / "doc.pdf")
+
+    monkeypatch.setenv("INCREA_REPO", str(first))
+    monkeypatch.setenv("HOME", str(tmp_path))
+    client = TestClient(create_app())
+    region = {"path": "doc.pdf", "page": 1, "x0": 0, "y0": 0, "x1": 600, "y1": 800}
+
+    response = client.get("/api/pdf/extract-region", params={"repo": "first", **region})
+    assert response.status_code == 200
+    assert response.json()["page_width"] > 0
+
+    response = client.put("/api/config/repos", json={"repos": [{"path": str(second)}]})
+    assert response.status_code == 200
+
+    response = client.get("/api/pdf/extract-region", params={"repo": "first", **region})
+    assert response.status_code == 404
+    response = client.get("/api/pdf/extract-region", params={"repo": "second", **region})
+    assert response.status_code == 200
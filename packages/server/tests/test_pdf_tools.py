@@ -0,0 +1,41 @@
+import asyncio
+
+import fitz
+import orjson
+
+from increa_reader import pdf_tools
+
+
+def test_allowed_roots_cover_configured_repos_and_temp(monkeypatch, tmp_path):
+    workspace = tmp_path / "workspace"
+    workspace.mkdir()
+    outside = tmp_path.parent / "elsewhere.pdf"
+    monkeypatch.setattr("tempfile.tempdir", str(tmp_path / "tmp"))
+    monkeypatch.setattr(pdf_tools, "_ALLOWED_ROOTS", ())
+
+    pdf_tools.set_allowed_roots([str(workspace)])
+
+    assert pdf_tools._is_allowed_path(str(workspace / "doc.pdf"))
+    assert pdf_tools._is_allowed_path(str(tmp_path / "tmp" / "page.png"))
+    assert not pdf_tools._is_allowed_path(str(outside))
+    assert not pdf_tools._is_allowed_path(str(workspace / ".." / "doc.pdf"))
+
+
+def test_search_text_snippets_keep_whole_words():
+    doc = fitz.open()
+    page = doc.new_page()
+    page.insert_text((72, 72), "The quick brown fox jumps over the lazy dog near", fontsize=11)
+    page.insert_text((72, 200), "unrelated text far below", fontsize=11)
+    pdf_tools.documents["search-test"] = doc
+    try:
+        result = asyncio.run(
+            pdf_tools.search_text.handler({"doc_id": "search-test", "query": "fox"})
+        )
+    finally:
+        pdf_tools.documents.pop("search-test").close()
+
+    [hit] = orjson.loads(result["content"][0]["text"])
+    assert hit["page"] == 1
+    assert "fox" in hit["text"]
+    # Every snippet word is a whole word from the page line
+    assert set(hit["text"].split()) <= set("The quick brown fox jumps over the lazy dog near".split())
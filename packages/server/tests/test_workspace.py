@@ -0,0 +1,28 @@
+from increa_reader.models import RepoItem, WorkspaceConfig
+from increa_reader.workspace import is_text_file
+
+
+def test_find_repo_follows_replaced_repos():
+    first = RepoItem(name="docs", root="/tmp/docs")
+    duplicate = RepoItem(name="docs", root="/tmp/other/docs")
+    config = WorkspaceConfig(title="Test", repos=[first, duplicate], excludes=[])
+
+    assert config.find_repo("docs") is first
+    assert config.find_repo("missing") is None
+
+    # /api/config/repos replaces the list contents in place
+    repos = config.repos
+    notes = RepoItem(name="notes", root="/tmp/notes")
+    config.replace_repos([notes])
+
+    assert config.repos is repos
+
+    assert config.find_repo("notes") is notes
+    assert config.find_repo("docs") is None
+
+
+def test_is_text_file_treats_nul_bytes_as_binary():
+    assert is_text_file("标题\nplain text".encode("utf-8"))
+    assert is_text_file(b"latin-1 caf\xe9")
+    assert not is_text_file(b"\x7fELF\x02\x01\x01\x00\x00\x00")
+    assert not is_text_file(b"\x89PNG\r\n\x1a\n\xff")
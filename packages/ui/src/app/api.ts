@@ -38,7 +38,20 @@ export async function fetchRepoTree(repoName: string): Promise<RepoTreeData> {
 export async function fetchPreview(repo: string, path: string): Promise<PreviewResponse> {
   const params = new URLSearchParams({ repo, path })
   const response = await fetch(`/api/preview?${params}`)
+  if (!response.ok) {
+    const error = await response.json().catch(() => ({}))
+    throw new Error(error.detail || 'Failed to load preview')
+  }
   const data = await response.json()
+  // Large text files come without a body; fetch it raw instead of wrapped in JSON
+  if (data.bodyUrl) {
+    const bodyResponse = await fetch(data.bodyUrl)
+    if (!bodyResponse.ok) {
+      const error = await bodyResponse.json().catch(() => ({}))
+      throw new Error(error.detail || 'Failed to load file content')
+    }
+    data.body = await bodyResponse.text()
+  }
   return data
 }
 
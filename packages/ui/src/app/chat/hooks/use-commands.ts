@@ -4,6 +4,9 @@ import type { Session } from '@/types/chat'
 import { HELP_TEXT } from '../utils'
 import type { useSessionManager } from './use-session-manager'
 
+const RENAME_POLL_INTERVAL_MS = 1000
+const RENAME_POLL_ATTEMPTS = 15
+
 type CommandContext = {
   currentSession: Session | null
   setCurrentSession: Dispatch<SetStateAction<Session | null>>
@@ -24,6 +27,26 @@ export const useCommands = (ctx: CommandContext) => {
     })
   }
 
+  // The server names saved logs in the background; poll until the final name is known
+  const reportRenamedLog = async (filename: string) => {
+    for (let attempt = 0; attempt < RENAME_POLL_ATTEMPTS; attempt++) {
+      await new Promise(resolve => setTimeout(resolve, RENAME_POLL_INTERVAL_MS))
+      try {
+        const response = await fetch(`/api/chat/save/${encodeURIComponent(filename)}`)
+        if (!response.ok) return
+        const status = await response.json()
+        if (!status.renamePending) {
+          if (status.filename !== filename) {
+            addMessage('system', `Chat log renamed to ${status.filename}`)
+          }
+          return
+        }
+      } catch {
+        return
+      }
+    }
+  }
+
   const handleSave = async () => {
     if (!currentSession || currentSession.messages.length === 0) {
       addMessage('error', 'No chat history to save')
@@ -43,7 +66,12 @@ export const useCommands = (ctx: CommandContext) => {
 
       if (response.ok) {
         const result = await response.json()
-        addMessage('system', `Chat saved to ${result.filename}`)
+        if (result.renamePending) {
+          addMessage('system', `Chat saved to ${result.filename} (naming in background)`)
+          void reportRenamedLog(result.filename)
+        } else {
+          addMessage('system', `Chat saved to ${result.filename}`)
+        }
       } else {
         const error = await response.json()
         addMessage('error', error.detail || 'Failed to save chat')
@@ -62,4 +62,4 @@ export type SSEMessage =
   | { type: 'assistant'; content: string }
   | { type: 'result'; session_id: string; duration_ms: number; usage: Message['usage'] }
   | { type: 'error'; message: string }
-  | { type: 'tool_call'; call_id: string; name: string; arguments: Record<string, unknown> }
+  | { type: 'tool_call'; call_id: number; name: string; arguments: Record<string, unknown> }